@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Rendering benchmark with synthetic media.
+
+Generates test clips locally with ffmpeg's lavfi testsrc2 (several
+resolutions, durations and codecs, plus rotated MOVs like the ones iPhones
+record), then times the render pipeline stage by stage:
+
+  probe     server.get_video_duration_and_size   (cold and cached)
+  overlay   server.create_text_overlay           (cold and cached)
+  hooks     server.mark_hook_as_used
+  render    server.generate_video_internal       (per encode profile)
+  reel      video_generator.create_video         (per backend)
+
+Everything runs in a scratch directory, so the real hook library, uploads
+and outputs are never touched. Results are written as JSON; pass
+--compare to diff against a run from another commit.
+
+Usage:
+  python benchmark.py                         # full run -> bench_results.json
+  python benchmark.py --quick                 # one small clip, one repeat
+  python benchmark.py --compare old.json      # flag stages that got slower
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# (name, width, height, duration, codec, rotation)
+MEDIA_MATRIX = [
+    ("portrait_1080p_5s_h264", 1080, 1920, 5, "libx264", 0),
+    ("portrait_1080p_15s_h264", 1080, 1920, 15, "libx264", 0),
+    ("portrait_720p_5s_h264", 720, 1280, 5, "libx264", 0),
+    ("landscape_1080p_5s_h264", 1920, 1080, 5, "libx264", 0),
+    ("landscape_4k_5s_hevc", 3840, 2160, 5, "libx265", 0),
+    # Stored landscape, displayed portrait, like iPhone MOVs
+    ("iphone_rotated_1080p_5s_mov", 1920, 1080, 5, "libx264", 90),
+]
+QUICK_MEDIA = ["portrait_720p_5s_h264"]
+
+# A regression is flagged when a stage's median is this much slower
+REGRESSION_THRESHOLD = 1.15
+
+
+def run(cmd):
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def has_encoder(name):
+    out = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True).stdout
+    return f" {name} " in out
+
+
+def make_clip(media_dir, name, width, height, duration, codec, rotation):
+    """Render one synthetic clip with test pattern video and a sine tone."""
+    ext = ".mov" if rotation else ".mp4"
+    path = media_dir / f"{name}{ext}"
+    if path.exists():
+        return path
+
+    raw_path = media_dir / f"{name}.raw{ext}"
+    run([
+        'ffmpeg', '-y',
+        '-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate=30:duration={duration}",
+        '-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration}",
+        '-c:v', codec, '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-shortest',
+        str(raw_path)
+    ])
+
+    if not rotation:
+        raw_path.rename(path)
+        return path
+
+    # Newer ffmpeg sets a display matrix; older ones only understand the rotate tag
+    try:
+        run(['ffmpeg', '-y', '-display_rotation', str(rotation), '-i', str(raw_path),
+             '-c', 'copy', str(path)])
+    except subprocess.CalledProcessError:
+        run(['ffmpeg', '-y', '-i', str(raw_path), '-c', 'copy',
+             '-metadata:s:v:0', f"rotate={rotation}", str(path)])
+    raw_path.unlink()
+    return path
+
+
+def generate_media(media_dir, names):
+    media = {}
+    for name, width, height, duration, codec, rotation in MEDIA_MATRIX:
+        if name not in names:
+            continue
+        if not has_encoder(codec):
+            print(f"   skipping {name}: ffmpeg has no {codec} encoder")
+            continue
+        print(f"   generating {name}")
+        media[name] = make_clip(media_dir, name, width, height, duration, codec, rotation)
+    return media
+
+
+def timed(fn, repeat):
+    """Run fn repeat times; returns the list of wall-clock seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(stage, case, times):
+    result = {
+        "stage": stage,
+        "case": case,
+        "runs": len(times),
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "times_s": times,
+    }
+    print(f"   {stage:<24} {case:<40} median {result['median_s'] * 1000:9.1f} ms")
+    return result
+
+
+def fresh_hook_library(server, work_dir):
+    """
+    Give the server a newly imported scratch hook store. Renders and
+    mark_hook_as_used consume hooks, so each stage starts from the full
+    library instead of running it dry over many repeats.
+    """
+    from hook_index import HookIndex
+    from hook_store import HookStore
+
+    server.hook_store = HookStore(str(work_dir / f"hooks_{os.urandom(4).hex()}.db"))
+    server.hook_store.sync_from_json(server.HOOKS_FILE, server.USED_HOOKS_FILE)
+    server.hook_index = HookIndex(
+        loader=server.load_hooks,
+        signature=lambda: (server.file_signature(server.HOOKS_FILE), server.file_signature(server.USED_HOOKS_FILE))
+    )
+
+
+def bench_server(media, work_dir, repeat, profiles):
+    """Stage timings for the Flask server's render path."""
+    # server.py uses paths relative to the working directory
+    os.chdir(work_dir)
+    shutil.copy(REPO_DIR / "top_hooks.json", work_dir / "top_hooks.json")
+    sys.path.insert(0, str(REPO_DIR))
+    import server
+    from media_probe import ProbeCache
+    from overlay_cache import OverlayCache
+
+    results = []
+
+    for name, path in media.items():
+        def probe_cold():
+            server.probe_cache = ProbeCache(str(work_dir / f"probe_{os.urandom(4).hex()}.db"))
+            server.get_video_duration_and_size(str(path))
+        results.append(summarize("probe.cold", name, timed(probe_cold, repeat)))
+        results.append(summarize("probe.cached", name,
+                                 timed(lambda: server.get_video_duration_and_size(str(path)), repeat)))
+
+    hook_text = server.load_hooks()[0]['text']
+    sizes = sorted({server.get_video_duration_and_size(str(p))[:2] for p in media.values()})
+    for w, h in sizes:
+        def overlay_cold():
+            server.overlay_cache = OverlayCache(str(work_dir / f"overlay_{os.urandom(4).hex()}"))
+            server.create_text_overlay(hook_text, 5, (w, h))
+        results.append(summarize("overlay.cold", f"{w}x{h}", timed(overlay_cold, repeat)))
+        results.append(summarize("overlay.cached", f"{w}x{h}",
+                                 timed(lambda: server.create_text_overlay(hook_text, 5, (w, h)), repeat)))
+
+    fresh_hook_library(server, work_dir)
+    hooks = iter(server.load_hooks())
+    results.append(summarize("hooks.mark_used", f"{len(server.load_hooks())} hooks",
+                             timed(lambda: server.mark_hook_as_used(next(hooks)), repeat)))
+
+    for name, path in media.items():
+        for profile in profiles:
+            fresh_hook_library(server, work_dir)
+
+            def render_cold():
+                # A fresh content hash misses the output and probe caches like a new upload
+                server.generate_video_internal(str(path), "Shocked",
+                                               input_hash=f"bench-{os.urandom(8).hex()}", profile=profile)
+            results.append(summarize(f"render.{profile}", name, timed(render_cold, repeat)))
+
+            input_hash = f"bench-{name}"
+            server.generate_video_internal(str(path), "Shocked", input_hash=input_hash, profile=profile)
+            results.append(summarize(f"render.{profile}.cached", name, timed(
+                lambda: server.generate_video_internal(str(path), "Shocked", input_hash=input_hash, profile=profile),
+                repeat)))
+
+    return results
+
+
+def bench_generator(media, work_dir, repeat, backends):
+    """End-to-end timings for video_generator.create_video."""
+    sys.path.insert(0, str(REPO_DIR))
+    # video_generator loads its hooks through the store at import time;
+    # keep that store in the scratch directory
+    import hook_store
+    hook_store.DB_FILE = str(work_dir / "generator_hooks.db")
+    import video_generator
+
+    ugc_dir = work_dir / "ugc"
+    demo_dir = work_dir / "demos"
+    out_dir = work_dir / "reels"
+    for d in (ugc_dir, demo_dir, out_dir):
+        d.mkdir(parents=True, exist_ok=True)
+
+    # Portrait clip as the reaction, the longest clip as the demo
+    ugc_src = media.get("portrait_1080p_5s_h264") or next(iter(media.values()))
+    demo_src = media.get("portrait_1080p_15s_h264") or ugc_src
+    shutil.copy(ugc_src, ugc_dir / f"ugc_shocked{ugc_src.suffix}")
+    shutil.copy(demo_src, demo_dir / f"demo{demo_src.suffix}")
+
+    video_generator.UGC_FOLDER = ugc_dir
+    video_generator.DEMO_FOLDER = demo_dir
+    video_generator.OUTPUT_FOLDER = out_dir
+    video_generator.MEZZANINE_FOLDER = demo_dir / ".mezzanine"
+    video_generator.SEGMENT_FOLDER = work_dir / "segment_cache"
+
+    results = []
+    hook = "Wait, you can put notes ON your lock screen?!"
+    for backend in backends:
+        times = timed(lambda: video_generator.create_video("shocked", hook, 1, backend=backend), repeat)
+        results.append(summarize(f"reel.{backend}", "shocked", times))
+    return results
+
+
+def environment():
+    ffmpeg_version = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True).stdout.split('\n')[0]
+    commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    return {
+        "commit": commit or None,
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": ffmpeg_version,
+    }
+
+
+def compare(results, baseline_path):
+    """Print median ratios against a previous run; returns True if anything regressed."""
+    with open(baseline_path) as f:
+        baseline = {(r["stage"], r["case"]): r for r in json.load(f)["results"]}
+
+    regressed = False
+    print(f"\n📊 Compared with {baseline_path}")
+    for r in results:
+        old = baseline.get((r["stage"], r["case"]))
+        if not old or not old["median_s"]:
+            continue
+        ratio = r["median_s"] / old["median_s"]
+        flag = "⚠️ " if ratio > REGRESSION_THRESHOLD else "  "
+        regressed |= ratio > REGRESSION_THRESHOLD
+        print(f"{flag} {r['stage']:<24} {r['case']:<40} {ratio:5.2f}x")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NoteWall render pipeline.")
+    parser.add_argument("--output", default="bench_results.json", help="where to write JSON results")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (default: %(default)s)")
+    parser.add_argument("--quick", action="store_true", help="one small clip, one repeat")
+    parser.add_argument("--profiles", default="preview,standard", help="server encode profiles to time")
+    parser.add_argument("--backends", default="ffmpeg", help="video_generator backends to time (moviepy,ffmpeg)")
+    parser.add_argument("--media-dir", help="keep generated clips here and reuse them between runs")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    if not shutil.which('ffmpeg') or not shutil.which('ffprobe'):
+        print("❌ ffmpeg and ffprobe must be on PATH")
+        sys.exit(1)
+
+    repeat = 1 if args.quick else args.repeat
+    names = QUICK_MEDIA if args.quick else [m[0] for m in MEDIA_MATRIX]
+    output_path = Path(args.output).resolve()
+    baseline_path = Path(args.compare).resolve() if args.compare else None
+
+    with tempfile.TemporaryDirectory(prefix="notewall_bench_") as tmp:
+        work_dir = Path(tmp)
+        media_dir = Path(args.media_dir).resolve() if args.media_dir else work_dir / "media"
+        media_dir.mkdir(parents=True, exist_ok=True)
+
+        print("🎞️  Generating synthetic media...")
+        media = generate_media(media_dir, names)
+
+        print("\n⏱️  Server stages")
+        results = bench_server(media, work_dir, repeat, args.profiles.split(','))
+
+        print("\n⏱️  Reel generator")
+        results += bench_generator(media, work_dir, repeat, args.backends.split(','))
+
+        os.chdir(REPO_DIR)
+
+    report = {"environment": environment(), "repeat": repeat, "results": results}
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {output_path}")
+
+    if baseline_path and compare(results, baseline_path):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
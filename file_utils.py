@@ -0,0 +1,41 @@
+"""
+File helpers shared by the stores and caches.
+
+file_signature() is the cheap change check for source files: the stores
+re-import or rebuild when it differs from the one recorded last time.
+atomic_write() writes to a temp name next to the target and renames it
+into place, so readers (other threads, other processes, ffmpeg) only ever
+see the old file or the complete new one.
+"""
+
+import os
+from contextlib import contextmanager
+
+
+def file_signature(path):
+    """mtime and size of path as a string, or None if it can't be stat'ed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+@contextmanager
+def atomic_write(path, mode='wb', **kwargs):
+    """
+    Open a temp file for writing and rename it over path once the block
+    finishes. If the block raises, the temp file is removed and path is
+    left untouched.
+    """
+    tmp_path = f"{path}.{os.urandom(4).hex()}.tmp"
+    try:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,92 @@
+"""
+Process-wide font registry shared by the server and the CLI generator.
+
+Candidate paths are checked once per process and loaded FreeTypeFont
+objects are kept keyed by (path, size, index), so renders never stat the
+filesystem or re-parse a font file.
+"""
+
+import os
+import threading
+
+from PIL import ImageFont
+
+# First existing path wins
+FONT_CANDIDATES = [
+    # macOS
+    "/System/Library/Fonts/HelveticaNeue.ttc",
+    "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
+    "/Library/Fonts/Arial Bold.ttf",
+    "/System/Library/Fonts/SFCompactRounded-Bold.otf",
+    "/System/Library/Fonts/SFNSDisplayCondensed-Bold.otf",
+    "/System/Library/Fonts/Helvetica.ttc",
+    # Linux
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/liberation-sans/LiberationSans-Bold.ttf",
+    # Windows
+    "C:/Windows/Fonts/arialbd.ttf",
+    "C:/Windows/Fonts/segoeui.ttf",
+]
+
+# In .ttc collections like HelveticaNeue.ttc, face 1 is usually Bold
+TTC_BOLD_INDEX = 1
+
+_font_path = None
+_discovered = False
+_fonts = {}
+# Face index that loaded for each .ttc, so a missing bold face is tried once
+_ttc_index = {}
+_lock = threading.Lock()
+
+
+def find_font():
+    """Return the path of the preferred bold font, or None if none is installed."""
+    global _font_path, _discovered
+    if not _discovered:
+        with _lock:
+            if not _discovered:
+                _font_path = next((fp for fp in FONT_CANDIDATES if os.path.exists(fp)), None)
+                _discovered = True
+    return _font_path
+
+
+def _load(path, size, index):
+    key = (path, size, index)
+    font = _fonts.get(key)
+    if font is None:
+        font = ImageFont.truetype(path, size, index=index)
+        with _lock:
+            _fonts[key] = font
+    return font
+
+
+def load_font(size, path=None):
+    """
+    Return a cached font for size, falling back to Pillow's default font.
+
+    For .ttc collections the bold face is tried first, then face 0.
+    """
+    path = path or find_font()
+    if not path:
+        return ImageFont.load_default()
+
+    try:
+        if path.endswith('.ttc'):
+            index = _ttc_index.get(path)
+            if index is not None:
+                return _load(path, size, index)
+            try:
+                font = _load(path, size, TTC_BOLD_INDEX)
+                index = TTC_BOLD_INDEX
+            except Exception:
+                font = _load(path, size, 0)
+                index = 0
+            with _lock:
+                _ttc_index[path] = index
+            return font
+        return _load(path, size, 0)
+    except Exception as e:
+        print(f"Font load error: {e}")
+        return ImageFont.load_default()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini generateContent endpoint.
+
+Answers POST /v1beta/models/<model>:generateContent with a JSON array of
+made-up hooks, so process_hooks.py and hook_generation.py can run offline,
+in CI, or under a benchmark without an API key or quota:
+
+    python gemini_stub.py --port 8765 --latency 0.5 --fail-rate 0.2
+    GEMINI_BASE_URL=http://127.0.0.1:8765 python process_hooks.py
+
+The failure knobs exercise the client's retry and hedging paths: requests
+can be slow, fail with a 503, or return a truncated JSON array.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+
+OPENERS = [
+    "Wait, you can put notes", "Nobody told me I could pin my to-do list", "I deleted my notes app",
+    "This lock screen trick", "Stop scrolling if you forget", "I thought this was fake but",
+    "POV: your wallpaper", "Bro, this iPhone setting", "If you have ADHD,", "I was today years old",
+]
+CLOSERS = [
+    "ON your lock screen?!", "and it actually works.", "changed my whole week.", "feels illegal.",
+    "before your next exam.", "nobody talks about this.", "100x productivity.", "do this NOW.",
+]
+
+EMOTION_RE = re.compile(r"\*\*Emotion for this batch:\*\*\s*([A-Za-z ]+)")
+COUNT_RE = re.compile(r"EXACTLY (\d+) hooks")
+
+
+def fake_hooks(prompt, rng):
+    """The JSON array text a well-behaved model might return for prompt."""
+    emotion_match = EMOTION_RE.search(prompt)
+    count_match = COUNT_RE.search(prompt)
+    emotion = emotion_match.group(1).strip() if emotion_match else "Life Hack"
+    count = int(count_match.group(1)) if count_match else 20
+
+    hooks = [
+        {"text": f"{rng.choice(OPENERS)} {rng.choice(CLOSERS)} #{rng.randrange(10 ** 6)}", "emotion": emotion}
+        for _ in range(count)
+    ]
+    return "```json\n" + json.dumps(hooks, indent=2) + "\n```"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Set per server by make_server()
+    latency = 0.0
+    fail_rate = 0.0
+    truncate_rate = 0.0
+    rng = random.Random()
+
+    def do_POST(self):
+        if not re.match(r"^/v1beta/models/[^/:]+:generateContent", self.path):
+            self._send(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            prompt = "".join(
+                part.get("text", "")
+                for content in body.get("contents", [])
+                for part in content.get("parts", [])
+            )
+        except (ValueError, AttributeError):
+            self._send(400, {"error": {"code": 400, "message": "Invalid JSON body"}})
+            return
+
+        if self.latency:
+            # Jittered so some requests are slow enough to trigger hedging
+            time.sleep(self.latency * self.rng.uniform(0.5, 2.0))
+        if self.rng.random() < self.fail_rate:
+            self._send(503, {"error": {"code": 503, "message": "The model is overloaded."}})
+            return
+
+        text = fake_hooks(prompt, self.rng)
+        if self.rng.random() < self.truncate_rate:
+            text = text[:len(text) // 2]
+
+        self._send(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]
+        })
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        print(f"[stub] {self.address_string()} {format % args}")
+
+
+def make_server(port=DEFAULT_PORT, latency=0.0, fail_rate=0.0, truncate_rate=0.0, seed=None):
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "latency": latency,
+        "fail_rate": fail_rate,
+        "truncate_rate": truncate_rate,
+        "rng": random.Random(seed),
+    })
+    return ThreadingHTTPServer(('127.0.0.1', port), handler)
+
+
+def start_in_background(**kwargs):
+    """Start a stub on a free port in a daemon thread. Returns (server, base_url)."""
+    server = make_server(port=0, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the Gemini generateContent API.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean response delay in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="fraction of responses cut off mid-JSON")
+    parser.add_argument("--seed", type=int, help="make responses reproducible")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.fail_rate, args.truncate_rate, args.seed)
+    print(f"Gemini stub listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Columnar cache of the Social Growth Engineers hooks dataset.
+
+Opening the .xlsx with openpyxl in full mode builds every cell object in
+memory and takes seconds on each run. The workbook is instead streamed
+once with a read-only reader and the columns we use are written to a
+compact .npz next to it. Later runs load the arrays in milliseconds; the
+cache is rebuilt whenever the workbook's mtime or size changes.
+
+The sheet's counts are text ("1.2M", "12,345" or blank); parse_counts()
+turns a whole column into numbers at once when the cache is built, so the
+cache holds them as integers. The .npz is compressed, which also squeezes
+out the padding of numpy's fixed-width string columns. score_hooks() ranks
+rows with one of the registered scorers; top_k() then picks the best rows
+without sorting everything.
+
+    python hook_dataset.py                # build or refresh the cache, show the top hooks
+    python hook_dataset.py engagement     # ... ranked by another scorer
+"""
+
+import os
+import sys
+from datetime import date, datetime
+
+import numpy as np
+
+from file_utils import atomic_write, file_signature
+
+EXCEL_FILE = "[Social Growth Engineers] Education & Productivity Hooks Dataset.xlsx"
+CACHE_FILE = "hooks_dataset.npz"
+
+# Column indices (0-based) in the sheet:
+# ('Username', 'Video URL', 'Hook', 'Caption', 'Duration', 'Posted At', 'Views', 'Likes', 'Comments', ...)
+COLUMNS = {
+    "hook": 2,
+    "posted_at": 5,
+    "views": 6,
+    "likes": 7,
+    "comments": 8,
+}
+DATA_START_ROW = 4
+# Columns cached as parsed integer counts rather than text
+COUNT_COLUMNS = ("views", "likes", "comments")
+
+# Bump when the cache layout changes so old files are rebuilt
+CACHE_VERSION = 2
+
+# Suffix multipliers for abbreviated counts ("1.2M", "950K")
+COUNT_SUFFIXES = {"k": 1e3, "m": 1e6, "b": 1e9}
+
+# Per-unit weights for the engagement scorer: a comment is a much stronger
+# signal than a like, which is stronger than a view
+ENGAGEMENT_WEIGHTS = {"views": 1.0, "likes": 10.0, "comments": 50.0}
+
+
+def workbook_signature(path):
+    return f"{CACHE_VERSION}:{file_signature(path)}"
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def read_workbook(path):
+    """Stream the workbook once and return {column: list of str}."""
+    import openpyxl
+
+    columns = {name: [] for name in COLUMNS}
+    last_col = max(COLUMNS.values())
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        for row in ws.iter_rows(min_row=DATA_START_ROW, max_col=last_col + 1, values_only=True):
+            if not row or len(row) <= COLUMNS["hook"] or not row[COLUMNS["hook"]]:
+                continue
+            for name, index in COLUMNS.items():
+                columns[name].append(_cell_text(row[index]) if index < len(row) else "")
+    finally:
+        # Read-only workbooks keep the file handle open until closed
+        wb.close()
+
+    return columns
+
+
+def build_cache(path=EXCEL_FILE, cache_path=CACHE_FILE):
+    """Read the workbook and write the columnar cache. Returns the arrays."""
+    columns = read_workbook(path)
+    arrays = {}
+    for name, values in columns.items():
+        if name in COUNT_COLUMNS:
+            arrays[name] = np.rint(parse_counts(values)).astype(np.int64)
+        else:
+            arrays[name] = np.array(values, dtype=str)
+
+    with atomic_write(cache_path) as f:
+        np.savez_compressed(f, signature=np.array(workbook_signature(path)), **arrays)
+    return arrays
+
+
+def load_cache(path=EXCEL_FILE, cache_path=CACHE_FILE):
+    """The cached arrays if they are up to date with the workbook, else None."""
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if str(data["signature"]) != workbook_signature(path):
+                return None
+            return {name: data[name] for name in COLUMNS}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def load_dataset(path=EXCEL_FILE, cache_path=CACHE_FILE):
+    """
+    Columns of the dataset as numpy arrays of equal length (int64 for
+    COUNT_COLUMNS, strings otherwise), from the cache when possible.
+    """
+    arrays = load_cache(path, cache_path)
+    if arrays is None:
+        print(f"Building dataset cache from {path}...")
+        arrays = build_cache(path, cache_path)
+    return arrays
+
+
+# ── Scoring ───────────────────────────────────────────────
+
+def parse_counts(values):
+    """
+    Parse a column of count strings into floats in one vectorized pass.
+    Handles "12,345", "1.2M", "950K", "3b" and plain numbers; blanks and
+    anything unparseable become 0.
+    """
+    text = np.char.lower(np.char.strip(np.asarray(values, dtype=str)))
+    text = np.char.replace(np.char.replace(text, ',', ''), ' ', '')
+
+    multiplier = np.ones(text.shape)
+    for suffix, factor in COUNT_SUFFIXES.items():
+        multiplier[np.char.endswith(text, suffix)] = factor
+    number = np.char.rstrip(text, ''.join(COUNT_SUFFIXES))
+
+    # Decimal digits with at most one point (isdigit also accepts "²", which float() rejects)
+    valid = np.char.isdecimal(np.char.replace(number, '.', '', count=1))
+    parsed = np.where(valid, number, '0').astype(float)
+    return parsed * multiplier
+
+
+SCORERS = {}
+
+
+def scorer(name):
+    """Register fn(counts) -> score array under name. counts maps column -> floats."""
+    def register(fn):
+        SCORERS[name] = fn
+        return fn
+    return register
+
+
+@scorer("views")
+def score_views(counts):
+    return counts["views"]
+
+
+@scorer("engagement")
+def score_engagement(counts):
+    return sum(weight * counts[column] for column, weight in ENGAGEMENT_WEIGHTS.items())
+
+
+def score_hooks(dataset, name="views"):
+    """Score every row of the dataset with the named scorer."""
+    if name not in SCORERS:
+        raise ValueError(f"Unknown scorer '{name}' (have: {', '.join(SCORERS)})")
+    counts = {column: dataset[column].astype(float) for column in COUNT_COLUMNS}
+    return SCORERS[name](counts)
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first, via partial selection."""
+    scores = np.asarray(scores)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=int)
+    if k < len(scores):
+        # O(n) partition, then sort only the k winners
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+if __name__ == "__main__":
+    if not os.path.exists(EXCEL_FILE):
+        print(f"File not found: {EXCEL_FILE}")
+        sys.exit(1)
+
+    scorer_name = sys.argv[1] if len(sys.argv) > 1 else "views"
+    dataset = load_dataset()
+    print(f"{len(dataset['hook'])} rows cached in {CACHE_FILE}")
+
+    scores = score_hooks(dataset, scorer_name)
+    for i in top_k(scores, 5):
+        print(f"  {scores[i]:>14,.0f} {scorer_name} - {dataset['hook'][i]}")
@@ -0,0 +1,253 @@
+"""
+Sharded, concurrent hook generation with Gemini.
+
+Asking for 100 hooks in one call is slow and fragile: one truncated
+response fails the whole run. Instead the library is split into shards
+(one per emotion, 20 hooks each) that are requested concurrently with
+asyncio. Each shard has its own timeout and retries, and is hedged: if
+the first request hasn't answered after HEDGE_AFTER seconds a second
+identical one is raised and whichever finishes first wins. The shard
+results are merged and deduplicated.
+
+The model sits behind a small client interface with two implementations:
+the google-genai SDK, and a plain REST client for any endpoint speaking
+the generateContent API, such as gemini_stub.py for offline runs:
+
+    python gemini_stub.py &
+    GEMINI_BASE_URL=http://127.0.0.1:8765 python process_hooks.py
+"""
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import random
+import re
+import urllib.request
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+EMOTIONS = ["Shocked", "Frustrated", "Skeptical", "Urgent", "Life Hack"]
+HOOKS_PER_SHARD = 20
+
+# Seconds before one request attempt is abandoned
+SHARD_TIMEOUT = 90
+# Attempts per shard, with RETRY_BACKOFF * 2**n seconds (plus jitter) between them
+SHARD_ATTEMPTS = 3
+RETRY_BACKOFF = 2
+# Seconds to wait for the first request before hedging with a second one
+HEDGE_AFTER = 30
+
+
+class GenerationError(Exception):
+    pass
+
+
+# ── Clients ───────────────────────────────────────────────
+
+class GeminiClient(ABC):
+    """Interface: generate(prompt) returns the model's text response."""
+
+    @abstractmethod
+    async def generate(self, prompt):
+        ...
+
+
+class SdkClient(GeminiClient):
+    def __init__(self, api_key, model=DEFAULT_MODEL):
+        from google import genai
+        self.client = genai.Client(api_key=api_key)
+        self.model = model
+
+    async def generate(self, prompt):
+        response = await self.client.aio.models.generate_content(model=self.model, contents=[prompt])
+        return response.text
+
+
+class RestClient(GeminiClient):
+    """generateContent over plain HTTP; works against the real API or a stub."""
+
+    def __init__(self, base_url, api_key=None, model=DEFAULT_MODEL):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.model = model
+
+    def _post(self, prompt):
+        url = f"{self.base_url}/v1beta/models/{self.model}:generateContent"
+        body = json.dumps({"contents": [{"parts": [{"text": prompt}]}]}).encode('utf-8')
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["x-goog-api-key"] = self.api_key
+        req = urllib.request.Request(url, data=body, headers=headers, method='POST')
+        with urllib.request.urlopen(req, timeout=SHARD_TIMEOUT) as resp:
+            data = json.load(resp)
+
+        candidates = data.get("candidates") or []
+        if not candidates:
+            raise GenerationError(f"No candidates in response: {data}")
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    async def generate(self, prompt):
+        # urllib blocks, so each request gets a worker thread
+        return await asyncio.to_thread(self._post, prompt)
+
+
+def make_client(api_key=None, model=DEFAULT_MODEL, base_url=None):
+    """REST client when base_url is set (e.g. the local stub), SDK client otherwise."""
+    if base_url:
+        return RestClient(base_url, api_key, model)
+    return SdkClient(api_key, model)
+
+
+# ── Parsing ───────────────────────────────────────────────
+
+def parse_hooks_json(text):
+    """
+    JSON array from a model response. Strips markdown fences, and if the
+    array was cut off mid-way keeps every complete element before the cut.
+    """
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0]
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0]
+    text = text.strip()
+
+    try:
+        items = json.loads(text)
+        if isinstance(items, list):
+            return items
+    except json.JSONDecodeError:
+        pass
+
+    # Salvage a truncated array element by element
+    start = text.find('[')
+    if start < 0:
+        raise GenerationError("Response has no JSON array")
+    decoder = json.JSONDecoder()
+    items = []
+    pos = start + 1
+    while True:
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(text) or text[pos] == ']':
+            break
+        try:
+            item, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        items.append(item)
+
+    if not items:
+        raise GenerationError("Response has no complete JSON elements")
+    return items
+
+
+def normalize_emotion(emotion):
+    """Map the model's emotion label onto one of EMOTIONS."""
+    emotion = (emotion or "Life Hack").capitalize()
+    if "Life" in emotion or "Hack" in emotion: return "Life Hack"  # Handle space naming issues
+    if emotion in EMOTIONS: return emotion
+    # Map close enough
+    if "Relie" in emotion: return "Life Hack"
+    if "Urg" in emotion or "Fear" in emotion: return "Urgent"
+    if "Mind" in emotion or "Shock" in emotion: return "Shocked"
+    if "Anger" in emotion or "Hate" in emotion or "Frust" in emotion: return "Frustrated"
+    if "Curious" in emotion or "Skept" in emotion: return "Skeptical"
+    return "Life Hack"
+
+
+def clean_hooks(items, emotion=None):
+    """
+    Consistent {"text", "emotion"} objects from the parsed response. emotion,
+    if given, is used for items that don't carry a label (strings).
+    """
+    clean = []
+    for item in items:
+        if isinstance(item, str):
+            text, label = item, emotion
+            if label is None:
+                # If AI messed up and returned strings, try to categorize simply
+                label = "Shocked" if ("?" in text or "!" in text) else "Life Hack"
+        elif isinstance(item, dict):
+            text, label = item.get("text", ""), item.get("emotion") or emotion
+        else:
+            continue
+
+        text = str(text).replace("#NoteWall", "").strip()
+        if text:
+            clean.append({"text": text, "emotion": normalize_emotion(label)})
+    return clean
+
+
+def dedupe_key(text):
+    """Case, punctuation and whitespace-insensitive identity of a hook."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.casefold()).split())
+
+
+def merge_hooks(shards):
+    """Concatenate shard results, keeping the first of any duplicate texts."""
+    seen = set()
+    merged = []
+    for hooks in shards:
+        for hook in hooks:
+            key = dedupe_key(hook["text"])
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(hook)
+    return merged
+
+
+# ── Sharded generation ────────────────────────────────────
+
+async def _hedged(client, prompt):
+    """First successful response of one request, plus a hedge if it is slow."""
+    tasks = [asyncio.create_task(client.generate(prompt))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=HEDGE_AFTER)
+        if not done:
+            print(f"   no answer after {HEDGE_AFTER}s, hedging with a second request")
+            tasks.append(asyncio.create_task(client.generate(prompt)))
+
+        error = None
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                return await next_done
+            except Exception as e:
+                error = e
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def generate_shard(client, prompt, emotion, count):
+    """Hooks for one shard, retrying timeouts, API errors and unparseable output."""
+    for attempt in range(1, SHARD_ATTEMPTS + 1):
+        try:
+            text = await asyncio.wait_for(_hedged(client, prompt), SHARD_TIMEOUT)
+            hooks = clean_hooks(parse_hooks_json(text), emotion)
+            print(f"   {emotion}: {len(hooks)}/{count} hooks (attempt {attempt})")
+            return hooks
+        except Exception as e:
+            print(f"   {emotion}: attempt {attempt} failed: {type(e).__name__}: {e}")
+            if attempt < SHARD_ATTEMPTS:
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1) + random.random())
+
+    print(f"   {emotion}: giving up after {SHARD_ATTEMPTS} attempts")
+    return []
+
+
+async def generate_all(client, prompt_for, emotions=EMOTIONS, per_shard=HOOKS_PER_SHARD):
+    shards = await asyncio.gather(*(
+        generate_shard(client, prompt_for(emotion, per_shard), emotion, per_shard)
+        for emotion in emotions
+    ))
+    return merge_hooks(shards)
+
+
+def generate_hooks(client, prompt_for, emotions=EMOTIONS, per_shard=HOOKS_PER_SHARD):
+    """
+    Generate per_shard hooks for each emotion concurrently; prompt_for(emotion,
+    count) builds a shard's prompt. Returns the merged, deduplicated hooks.
+    """
+    return asyncio.run(generate_all(client, prompt_for, emotions, per_shard))
@@ -0,0 +1,93 @@
+"""
+Resident, emotion-bucketed index of the active hook library.
+
+Hook selection used to reload and filter the whole library on every
+request. The index keeps the active hooks in memory, bucketed by emotion,
+and only reloads when the signature function reports a change (the hook
+files' mtime/size). Random selection and removal are O(1): each bucket is
+a list plus a text -> position map, and removal swaps the last element into
+the hole.
+"""
+
+import random
+import threading
+
+
+class _Bucket:
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def add(self, hook):
+        if hook['text'] in self.positions:
+            return
+        self.positions[hook['text']] = len(self.items)
+        self.items.append(hook)
+
+    def discard(self, text):
+        pos = self.positions.pop(text, None)
+        if pos is None:
+            return
+        last = self.items.pop()
+        if pos < len(self.items):
+            self.items[pos] = last
+            self.positions[last['text']] = pos
+
+    def choice(self):
+        return random.choice(self.items) if self.items else None
+
+    def __len__(self):
+        return len(self.items)
+
+
+class HookIndex:
+    def __init__(self, loader, signature):
+        """
+        loader() returns the active hooks; signature() returns any hashable
+        value that changes whenever the loader's result may have changed.
+        """
+        self._loader = loader
+        self._signature = signature
+        self._loaded_signature = object()
+        self._all = _Bucket()
+        self._by_emotion = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Reload if the signature changed since the last load."""
+        signature = self._signature()
+        if signature == self._loaded_signature:
+            return
+        hooks = self._loader()
+        with self._lock:
+            self._all = _Bucket()
+            self._by_emotion = {}
+            for hook in hooks:
+                self._add(hook)
+            self._loaded_signature = signature
+
+    def _add(self, hook):
+        self._all.add(hook)
+        self._by_emotion.setdefault(hook.get('emotion', 'General'), _Bucket()).add(hook)
+
+    def add(self, hook):
+        with self._lock:
+            self._add(hook)
+
+    def discard(self, hook):
+        with self._lock:
+            self._all.discard(hook['text'])
+            bucket = self._by_emotion.get(hook.get('emotion', 'General'))
+            if bucket is not None:
+                bucket.discard(hook['text'])
+
+    def choose(self, emotion):
+        """Random hook for emotion, falling back to the full pool when its bucket is empty."""
+        with self._lock:
+            bucket = self._by_emotion.get(emotion)
+            if bucket:
+                return bucket.choice()
+            return self._all.choice()
+
+    def __len__(self):
+        return len(self._all)
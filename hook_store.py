@@ -0,0 +1,414 @@
+"""
+SQLite-backed hook store.
+
+Replaces rewriting top_hooks.json / used_hooks.json on every render. Each
+hook is one row; claiming, consuming and releasing a hook is a single
+indexed UPDATE inside a transaction, so concurrent renders can't lose each
+other's updates and a crash mid-write leaves the previous state intact.
+
+The JSON files stay the interchange format: they are imported whenever
+they change on disk (e.g. process_hooks.py wrote a new library) and can be
+exported again with:
+
+    python hook_store.py export
+
+Library hooks and scraped hooks (hooks-copy, the Excel dataset) are also
+indexed in an FTS5 table for search. Triggers keep it in step with every
+insert, status change and delete, so it never needs a full rebuild:
+
+    python hook_store.py index-scraped
+"""
+
+import base64
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+from file_utils import atomic_write, file_signature
+from sqlite_db import SQLiteDB
+
+DB_FILE = 'hooks.db'
+HOOKS_FILE = 'top_hooks.json'
+USED_HOOKS_FILE = 'used_hooks.json'
+
+ACTIVE = 'active'
+CLAIMED = 'claimed'  # picked by a render that hasn't finished yet
+USED = 'used'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hooks (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE,
+    emotion TEXT NOT NULL DEFAULT 'General',
+    status TEXT NOT NULL DEFAULT 'active',
+    position INTEGER NOT NULL DEFAULT 0,
+    used_at TEXT,
+    used_seq INTEGER
+);
+CREATE INDEX IF NOT EXISTS hooks_status_emotion ON hooks(status, emotion);
+CREATE INDEX IF NOT EXISTS hooks_used_seq ON hooks(used_seq);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS scraped_hooks (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scraped_hooks_source ON scraped_hooks(source);
+"""
+
+# Library hooks are rowid 2*id, scraped hooks 2*id + 1, in one FTS table so
+# a query ranks them together
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS hooks_search USING fts5(
+    text, emotion UNINDEXED, status UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS hooks_search_insert AFTER INSERT ON hooks BEGIN
+    INSERT INTO hooks_search(rowid, text, emotion, status) VALUES (new.id * 2, new.text, new.emotion, new.status);
+END;
+CREATE TRIGGER IF NOT EXISTS hooks_search_update AFTER UPDATE OF text, emotion, status ON hooks BEGIN
+    UPDATE hooks_search SET text = new.text, emotion = new.emotion, status = new.status WHERE rowid = new.id * 2;
+END;
+CREATE TRIGGER IF NOT EXISTS hooks_search_delete AFTER DELETE ON hooks BEGIN
+    DELETE FROM hooks_search WHERE rowid = old.id * 2;
+END;
+CREATE TRIGGER IF NOT EXISTS scraped_search_insert AFTER INSERT ON scraped_hooks BEGIN
+    INSERT INTO hooks_search(rowid, text, emotion, status) VALUES (new.id * 2 + 1, new.text, NULL, 'scraped');
+END;
+CREATE TRIGGER IF NOT EXISTS scraped_search_delete AFTER DELETE ON scraped_hooks BEGIN
+    DELETE FROM hooks_search WHERE rowid = old.id * 2 + 1;
+END;
+"""
+# Bump to rebuild hooks_search from the tables on the next start
+SEARCH_VERSION = '1'
+
+SCRAPED = 'scraped'
+# Search results with equal text relevance: library hooks before history before scrapes
+STATUS_RANK = "CASE status WHEN 'active' THEN 0 WHEN 'claimed' THEN 0 WHEN 'used' THEN 1 ELSE 2 END"
+
+
+def normalize_hook(h):
+    """Hooks used to be plain strings; always hand back objects."""
+    if isinstance(h, str):
+        return {"text": h, "emotion": "General"}
+    if isinstance(h, dict) and h.get("text"):
+        return h
+    return None
+
+
+def fts_query(text):
+    """
+    FTS5 MATCH expression for free text: every word must match, as a prefix
+    so results show up while the user is still typing. Words are quoted, so
+    FTS syntax in the input is never interpreted.
+    """
+    return " ".join(f'"{term}"*' for term in re.findall(r"\w+", text.lower()))
+
+
+def encode_cursor(values):
+    """Opaque pagination cursor for the sort key of the last row on a page."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """
+    Inverse of encode_cursor for a sort key of length values. Raises
+    ValueError for anything malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != length or not all(isinstance(v, int) for v in values):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def _read_json_list(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        return []
+    return [h for h in map(normalize_hook, data) if h]
+
+
+def _write_json_atomic(path, data):
+    with atomic_write(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+class HookStore(SQLiteDB):
+    row_factory = sqlite3.Row
+
+    def __init__(self, db_path=DB_FILE):
+        super().__init__(db_path, wal=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.executescript(SEARCH_SCHEMA)
+        self._ensure_search_index()
+
+    def _get_meta(self, key):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_meta(conn, key, value):
+        conn.execute(
+            "INSERT INTO meta(key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def _ensure_search_index(self):
+        """Backfill hooks_search for databases created before it existed."""
+        if self._get_meta('search_version') == SEARCH_VERSION:
+            return
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM hooks_search")
+            conn.execute(
+                "INSERT INTO hooks_search(rowid, text, emotion, status) "
+                "SELECT id * 2, text, emotion, status FROM hooks"
+            )
+            conn.execute(
+                "INSERT INTO hooks_search(rowid, text, emotion, status) "
+                "SELECT id * 2 + 1, text, NULL, 'scraped' FROM scraped_hooks"
+            )
+            self._set_meta(conn, 'search_version', SEARCH_VERSION)
+
+    # ── JSON interchange ──────────────────────────────────
+
+    def sync_from_json(self, hooks_file=HOOKS_FILE, used_file=USED_HOOKS_FILE):
+        """
+        Import the JSON files if they changed since the last import.
+
+        used_hooks.json adds to the used history. top_hooks.json is the
+        authoritative active library: new hooks are added, hooks that were
+        dropped from it are removed, and hooks already used stay used.
+        """
+        used_sig = file_signature(used_file)
+        if used_sig and used_sig != self._get_meta('used_file_sig'):
+            self._import_used(_read_json_list(used_file), used_sig)
+
+        hooks_sig = file_signature(hooks_file)
+        if hooks_sig and hooks_sig != self._get_meta('hooks_file_sig'):
+            self._import_active(_read_json_list(hooks_file), hooks_sig)
+
+    def _import_used(self, used, signature):
+        with self._transaction() as conn:
+            seq = conn.execute("SELECT COALESCE(MAX(used_seq), 0) FROM hooks").fetchone()[0]
+            # File is newest first; oldest gets the lowest sequence number
+            for h in reversed(used):
+                seq += 1
+                conn.execute(
+                    "INSERT INTO hooks(text, emotion, status, used_at, used_seq) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(text) DO UPDATE SET status = excluded.status, "
+                    "used_at = excluded.used_at, used_seq = excluded.used_seq "
+                    "WHERE hooks.status != 'used'",
+                    (h['text'], h.get('emotion', 'General'), USED, h.get('used_at'), seq)
+                )
+            self._set_meta(conn, 'used_file_sig', signature)
+
+    def _import_active(self, active, signature):
+        with self._transaction() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS sync_texts (text TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM sync_texts")
+            for position, h in enumerate(active):
+                conn.execute(
+                    "INSERT INTO hooks(text, emotion, status, position) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(text) DO UPDATE SET emotion = excluded.emotion, "
+                    "position = excluded.position WHERE hooks.status = 'active'",
+                    (h['text'], h.get('emotion', 'General'), ACTIVE, position)
+                )
+                conn.execute("INSERT OR IGNORE INTO sync_texts(text) VALUES (?)", (h['text'],))
+            conn.execute(
+                "DELETE FROM hooks WHERE status = 'active' "
+                "AND text NOT IN (SELECT text FROM sync_texts)"
+            )
+            self._set_meta(conn, 'hooks_file_sig', signature)
+
+    def export_json(self, hooks_file=HOOKS_FILE, used_file=USED_HOOKS_FILE):
+        """Write the store back out in the original JSON formats."""
+        _write_json_atomic(hooks_file, self.active_hooks(include_claimed=True))
+        _write_json_atomic(used_file, self.used_hooks())
+        # Our own export is not a change that needs importing again
+        with self._transaction() as conn:
+            self._set_meta(conn, 'hooks_file_sig', file_signature(hooks_file))
+            self._set_meta(conn, 'used_file_sig', file_signature(used_file))
+
+    # ── Reads ─────────────────────────────────────────────
+
+    def active_hooks(self, emotion=None, include_claimed=False):
+        statuses = (ACTIVE, CLAIMED) if include_claimed else (ACTIVE,)
+        sql = f"SELECT text, emotion FROM hooks WHERE status IN ({','.join('?' * len(statuses))})"
+        params = list(statuses)
+        if emotion:
+            sql += " AND emotion = ?"
+            params.append(emotion)
+        sql += " ORDER BY position, id"
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+    def used_hooks(self):
+        rows = self._conn().execute(
+            "SELECT text, emotion, used_at FROM hooks WHERE status = 'used' ORDER BY used_seq DESC"
+        )
+        return [dict(row) for row in rows]
+
+    # ── Pages ─────────────────────────────────────────────
+
+    def active_page(self, emotion=None, limit=100, cursor=None):
+        """
+        One page of the active library in library order (claimed hooks
+        included, as in the export). Returns (hooks, next_cursor, total).
+        """
+        where = "status IN ('active', 'claimed')"
+        params = []
+        if emotion:
+            where += " AND emotion = ?"
+            params.append(emotion)
+        total = self._conn().execute(f"SELECT COUNT(*) FROM hooks WHERE {where}", params).fetchone()[0]
+
+        if cursor:
+            position, last_id = decode_cursor(cursor, 2)
+            where += " AND (position, id) > (?, ?)"
+            params += [position, last_id]
+        rows = self._conn().execute(
+            f"SELECT id, position, text, emotion FROM hooks WHERE {where} ORDER BY position, id LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        # One extra row tells us whether there is another page
+        next_cursor = encode_cursor([rows[limit - 1]['position'], rows[limit - 1]['id']]) if len(rows) > limit else None
+        hooks = [{"text": row['text'], "emotion": row['emotion']} for row in rows[:limit]]
+        return hooks, next_cursor, total
+
+    def used_page(self, emotion=None, limit=100, cursor=None):
+        """One page of the used history, newest first. Returns (hooks, next_cursor, total)."""
+        where = "status = 'used'"
+        params = []
+        if emotion:
+            where += " AND emotion = ?"
+            params.append(emotion)
+        total = self._conn().execute(f"SELECT COUNT(*) FROM hooks WHERE {where}", params).fetchone()[0]
+
+        if cursor:
+            (last_seq,) = decode_cursor(cursor, 1)
+            where += " AND used_seq < ?"
+            params.append(last_seq)
+        rows = self._conn().execute(
+            f"SELECT used_seq, text, emotion, used_at FROM hooks WHERE {where} ORDER BY used_seq DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        next_cursor = encode_cursor([rows[limit - 1]['used_seq']]) if len(rows) > limit else None
+        hooks = [{"text": row['text'], "emotion": row['emotion'], "used_at": row['used_at']} for row in rows[:limit]]
+        return hooks, next_cursor, total
+
+    # ── Search ────────────────────────────────────────────
+
+    def sync_scraped(self, source, signature, texts):
+        """
+        Replace the scraped hooks from source with texts (an iterable, consumed
+        only if signature differs from the one imported last time).
+        """
+        meta_key = f'scraped_sig:{source}'
+        if signature is None or signature == self._get_meta(meta_key):
+            return False
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM scraped_hooks WHERE source = ?", (source,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO scraped_hooks(text, source) VALUES (?, ?)",
+                ((text, source) for text in texts if text.strip())
+            )
+            self._set_meta(conn, meta_key, signature)
+        return True
+
+    def search(self, query, emotion=None, statuses=None, limit=20, offset=0):
+        """
+        Full-text search over library, used and scraped hooks, best match
+        first. Returns (results, total matches).
+        """
+        match = fts_query(query)
+        if not match:
+            return [], 0
+
+        where = "hooks_search MATCH ?"
+        params = [match]
+        if emotion:
+            where += " AND emotion = ?"
+            params.append(emotion)
+        if statuses:
+            where += f" AND status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM hooks_search WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT text, emotion, status, bm25(hooks_search) AS score FROM hooks_search "
+            f"WHERE {where} ORDER BY score, {STATUS_RANK}, rowid LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        )
+        # bm25 is lower-is-better; flip it so clients can treat it as relevance
+        results = [dict(row, score=round(-row['score'], 4)) for row in rows]
+        return results, total
+
+    # ── Claim / consume ───────────────────────────────────
+
+    def claim(self, text):
+        """Reserve an active hook for a render. False if someone else got it first."""
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE hooks SET status = 'claimed' WHERE text = ? AND status = 'active'", (text,)
+            )
+            return cur.rowcount == 1
+
+    def release(self, text):
+        """Return a claimed hook to the active pool (the render failed)."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE hooks SET status = 'active' WHERE text = ? AND status = 'claimed'", (text,))
+
+    def consume(self, hook):
+        """Mark a hook as used. Hooks the store doesn't know yet are recorded as used."""
+        used_at = datetime.now().isoformat(timespec='seconds')
+        with self._transaction() as conn:
+            seq = conn.execute("SELECT COALESCE(MAX(used_seq), 0) + 1 FROM hooks").fetchone()[0]
+            conn.execute(
+                "INSERT INTO hooks(text, emotion, status, used_at, used_seq) VALUES (?, ?, 'used', ?, ?) "
+                "ON CONFLICT(text) DO UPDATE SET status = 'used', "
+                "used_at = excluded.used_at, used_seq = excluded.used_seq",
+                (hook['text'], hook.get('emotion', 'General'), used_at, seq)
+            )
+
+    def release_all_claims(self):
+        """Claims left over from a crashed process go back to the pool."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE hooks SET status = 'active' WHERE status = 'claimed'")
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'export'
+    store = HookStore()
+    if command == 'import':
+        store.sync_from_json()
+        print(f"Imported: {len(store.active_hooks())} active, {len(store.used_hooks())} used")
+    elif command == 'export':
+        store.sync_from_json()
+        store.export_json()
+        print(f"Exported {HOOKS_FILE} and {USED_HOOKS_FILE}")
+    elif command == 'index-scraped':
+        from hook_dataset import EXCEL_FILE, load_dataset
+        from hooks_corpus import CORPUS_FILE, parse_corpus
+        store.sync_scraped('hooks-copy', file_signature(CORPUS_FILE),
+                           (r.text for r in parse_corpus(CORPUS_FILE)) if os.path.exists(CORPUS_FILE) else ())
+        store.sync_scraped('dataset', file_signature(EXCEL_FILE),
+                           (str(h) for h in load_dataset()["hook"]) if os.path.exists(EXCEL_FILE) else ())
+        count = store._conn().execute("SELECT COUNT(*) FROM scraped_hooks").fetchone()[0]
+        print(f"Indexed {count} scraped hooks for search")
+    else:
+        print("Usage: python hook_store.py [import|export|index-scraped]")
+        sys.exit(1)
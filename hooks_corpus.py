@@ -0,0 +1,180 @@
+"""
+Streaming parser and offset-indexed store for the scraped hooks corpus.
+
+hooks-copy is a plain-text scrape where every hook looks like:
+
+    <hook text, possibly over several lines>
+    (blank)
+    Anonymous
+    0
+    0
+    (blank)
+    Copy
+
+parse_corpus() walks it line by line and yields one Record per hook, so
+the file is never held in memory. build_store() writes the records to a
+compact on-disk store: a data file with one JSON array per record and an
+index file of their byte offsets. CorpusStore memory-maps the data and
+reads any record by number, so sampling k hooks costs k small reads no
+matter how large the corpus gets.
+
+    python hooks_corpus.py          # (re)build the store and show a sample
+"""
+
+import json
+import mmap
+import os
+import random
+import sys
+from array import array
+from collections import namedtuple
+
+from file_utils import atomic_write, file_signature
+
+CORPUS_FILE = 'hooks-copy'
+STORE_PATH = 'hooks_corpus'
+
+# Bump when the store layout changes so old stores are rebuilt
+STORE_VERSION = 1
+
+END_MARKER = 'Copy'
+
+Record = namedtuple('Record', ['text', 'author', 'counters'])
+
+
+def _is_int(line):
+    return line.strip().lstrip('-').isdigit()
+
+
+def _parse_block(lines):
+    """One record from the lines before a Copy marker (or the end of the file)."""
+    while lines and not lines[-1].strip():
+        lines.pop()
+
+    # Trailer: blank, author, then one or more counters
+    counters = []
+    while lines and _is_int(lines[-1]):
+        counters.insert(0, int(lines.pop().strip()))
+    author = None
+    if counters and len(lines) >= 2 and not lines[-2].strip():
+        author = lines.pop().strip()
+
+    text = '\n'.join(line.strip() for line in lines).strip()
+    if not text:
+        return None
+    return Record(text, author, tuple(counters))
+
+
+def parse_corpus(path=CORPUS_FILE):
+    """Yield a Record for every hook in the scrape, streaming the file."""
+    block = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line.strip() == END_MARKER:
+                record = _parse_block(block)
+                if record:
+                    yield record
+                block = []
+            else:
+                block.append(line)
+    # The last hook may be cut off before its Copy marker
+    record = _parse_block(block)
+    if record:
+        yield record
+
+
+def _source_signature(path):
+    return f"{STORE_VERSION}:{file_signature(path)}"
+
+
+def _paths(base_path):
+    return f"{base_path}.dat", f"{base_path}.idx", f"{base_path}.json"
+
+
+def build_store(source=CORPUS_FILE, base_path=STORE_PATH):
+    """Parse source into the data + offset index files. Returns the record count."""
+    data_path, index_path, meta_path = _paths(base_path)
+
+    offsets = array('Q')
+    with atomic_write(data_path) as data:
+        for record in parse_corpus(source):
+            offsets.append(data.tell())
+            data.write(json.dumps(list(record), ensure_ascii=False).encode('utf-8') + b'\n')
+        # Sentinel: record i spans offsets[i]:offsets[i + 1]
+        offsets.append(data.tell())
+    with atomic_write(index_path) as index:
+        offsets.tofile(index)
+
+    # Written last: a store is only valid once its meta matches the source
+    meta = {"source_signature": _source_signature(source), "count": len(offsets) - 1}
+    with atomic_write(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return meta["count"]
+
+
+def store_is_current(source=CORPUS_FILE, base_path=STORE_PATH):
+    try:
+        with open(_paths(base_path)[2]) as f:
+            meta = json.load(f)
+        return meta.get("source_signature") == _source_signature(source)
+    except (OSError, ValueError):
+        return False
+
+
+class CorpusStore:
+    def __init__(self, base_path=STORE_PATH):
+        data_path, index_path, _ = _paths(base_path)
+        self._offsets = array('Q')
+        with open(index_path, 'rb') as f:
+            self._offsets.frombytes(f.read())
+        self._file = open(data_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap can't map an empty file
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self):
+        return max(len(self._offsets) - 1, 0)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        raw = self._data[self._offsets[i]:self._offsets[i + 1]]
+        text, author, counters = json.loads(raw)
+        return Record(text, author, tuple(counters))
+
+    def sample(self, k, rng=random):
+        """k distinct random records (fewer if the corpus is smaller)."""
+        return [self[i] for i in rng.sample(range(len(self)), min(k, len(self)))]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+def open_corpus(source=CORPUS_FILE, base_path=STORE_PATH):
+    """The corpus store, rebuilt first if the scrape changed. None if there is no scrape."""
+    if not os.path.exists(source):
+        return None
+    if not store_is_current(source, base_path):
+        print(f"Indexing {source}...")
+        count = build_store(source, base_path)
+        print(f"Indexed {count} scraped hooks")
+    return CorpusStore(base_path)
+
+
+if __name__ == '__main__':
+    corpus = open_corpus()
+    if corpus is None:
+        print(f"File not found: {CORPUS_FILE}")
+        sys.exit(1)
+    print(f"{len(corpus)} hooks in {STORE_PATH}.dat")
+    for record in corpus.sample(5):
+        print(f"  - {record.text}")
@@ -0,0 +1,249 @@
+"""
+Background render jobs for the Flask server.
+
+Renders are submitted to a bounded thread pool (ffmpeg does the heavy
+lifting in a subprocess, so threads are enough) and tracked in memory so
+the HTTP layer can return a job id immediately and let clients poll or
+subscribe to updates. Jobs run in other threads (batch items) share the
+pool's MAX_RENDER_WORKERS slots, so the total number of concurrent
+renders stays bounded however many batches arrive.
+
+Every change to a job bumps its version and wakes wait_for_update(), which
+is what the server's event streams block on. Cancelling a running job only
+sets a flag; the job body checks it (raise_if_cancelled) and stops.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Max renders running at once, pooled jobs and batch items together. Extra
+# jobs wait in the queue. At least 3, so a default-size batch (the server's
+# BATCH_CONCURRENCY) renders all its items at once on an idle server; more on
+# big machines, about one per 4 cores since each x264 encode is multi-threaded.
+MAX_RENDER_WORKERS = int(os.environ.get("MAX_RENDER_WORKERS", max(3, (os.cpu_count() or 1) // 4)))
+
+# Finished jobs are forgotten after this many seconds
+JOB_TTL = 60 * 60
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_RENDER_WORKERS, thread_name_prefix="render")
+# Held by every running job, pooled or not
+_render_slots = threading.BoundedSemaphore(MAX_RENDER_WORKERS)
+# Seconds between cancellation checks while waiting for a slot
+SLOT_POLL = 0.5
+_jobs = {}
+_lock = threading.Lock()
+# Notified whenever any job changes
+_changed = threading.Condition(_lock)
+# Id of the job the current worker thread is running
+_current = threading.local()
+
+
+class JobCancelled(Exception):
+    """Raised inside a job body once the job has been cancelled."""
+
+
+def _prune_expired():
+    """Drop finished jobs older than JOB_TTL. Caller holds _lock."""
+    cutoff = time.time() - JOB_TTL
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job["status"] in FINISHED and job["finished_at"] < cutoff
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def _touch(job):
+    """Record a change to job. Caller holds _lock."""
+    job["version"] += 1
+    _changed.notify_all()
+
+
+def _finish(job, status, **fields):
+    with _lock:
+        job.update(fields, status=status, finished_at=time.time())
+        _touch(job)
+
+
+def _snapshot(job):
+    return dict(job, partial=dict(job["partial"]))
+
+
+def _run(job_id, fn, args, kwargs):
+    with _lock:
+        job = _jobs[job_id]
+
+    # The job stays queued (and cancellable) until a render slot is free
+    while not _render_slots.acquire(timeout=SLOT_POLL):
+        if job["cancel"].is_set():
+            return
+    try:
+        _run_holding_slot(job, fn, args, kwargs)
+    finally:
+        _render_slots.release()
+
+
+def _run_holding_slot(job, fn, args, kwargs):
+    with _lock:
+        if job["status"] == CANCELLED:
+            # Cancelled while it was still queued
+            return
+        job["status"] = RUNNING
+        job["started_at"] = time.time()
+        _touch(job)
+
+    _current.job_id = job["id"]
+    try:
+        result = fn(*args, **kwargs)
+    except JobCancelled:
+        _finish(job, CANCELLED)
+        return
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        _finish(job, FAILED, error=str(e))
+        return
+    finally:
+        _current.job_id = None
+
+    _finish(job, DONE, result=result)
+
+
+def create_job(job_id=None, cleanup=None):
+    """
+    Register a queued job and return its id. Fails if job_id is taken.
+
+    cleanup() is called if the job is cancelled before it starts, when the
+    job body (which normally cleans up after itself) will never run.
+    """
+    job_id = job_id or os.urandom(8).hex()
+    with _lock:
+        _prune_expired()
+        if job_id in _jobs:
+            raise ValueError(f"Job {job_id} already exists")
+        _jobs[job_id] = {
+            "id": job_id,
+            "status": QUEUED,
+            "result": None,
+            "partial": {},
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "version": 0,
+            "cancel": threading.Event(),
+            "cleanup": cleanup,
+        }
+        _changed.notify_all()
+    return job_id
+
+
+def submit_job(fn, *args, cleanup=None, **kwargs):
+    """
+    Queue fn(*args, **kwargs) on the render pool and return the new job id.
+    cleanup is as for create_job.
+    """
+    job_id = create_job(cleanup=cleanup)
+    # Run in a copy of the caller's context so the request's trace id follows the job
+    _executor.submit(contextvars.copy_context().run, _run, job_id, fn, args, kwargs)
+    return job_id
+
+
+def run_job(job_id, fn, *args, **kwargs):
+    """
+    Run fn in the calling thread as the already created job_id, so work that
+    doesn't go through the pool (batch items) still gets status, progress and
+    cancellation. Waits for a render slot like pooled jobs do. Returns the
+    finished job's snapshot.
+    """
+    _run(job_id, fn, args, kwargs)
+    return get_job(job_id)
+
+
+def get_job(job_id):
+    """Return a snapshot of the job, or None if it is unknown or expired."""
+    with _lock:
+        job = _jobs.get(job_id)
+        return _snapshot(job) if job else None
+
+
+def wait_for_update(job_ids, seen, timeout):
+    """
+    Block until one of job_ids exists with a version other than seen[job_id]
+    (or timeout seconds pass). Returns {job_id: snapshot} for the jobs that
+    exist.
+    """
+    def changed():
+        return any(
+            job_id in _jobs and _jobs[job_id]["version"] != seen.get(job_id)
+            for job_id in job_ids
+        )
+
+    with _changed:
+        _changed.wait_for(changed, timeout)
+        return {job_id: _snapshot(_jobs[job_id]) for job_id in job_ids if job_id in _jobs}
+
+
+def cancel_job(job_id):
+    """Cancel a queued or running job. False if it is unknown or already finished."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return False
+        never_ran = job["status"] == QUEUED
+        if never_ran:
+            job["status"] = CANCELLED
+            job["finished_at"] = time.time()
+        job["cancel"].set()
+        _touch(job)
+
+    if never_ran and job["cleanup"]:
+        try:
+            job["cleanup"]()
+        except Exception as e:
+            print(f"Cleanup for cancelled job {job_id} failed: {e}")
+    return True
+
+
+def queue_depth():
+    """Number of jobs waiting for a free render worker."""
+    with _lock:
+        return sum(1 for job in _jobs.values() if job["status"] == QUEUED)
+
+
+def _current_job():
+    job_id = getattr(_current, 'job_id', None)
+    return _jobs.get(job_id) if job_id is not None else None
+
+
+def cancel_requested():
+    """True if the job running on this thread has been cancelled."""
+    job = _current_job()
+    return job is not None and job["cancel"].is_set()
+
+
+def raise_if_cancelled():
+    if cancel_requested():
+        raise JobCancelled()
+
+
+def update_current_job(**fields):
+    """
+    Publish intermediate results (e.g. a preview URL or encode progress) from
+    inside a running job. A no-op when called outside a job.
+    """
+    with _lock:
+        job = _current_job()
+        if job is not None:
+            job["partial"].update(fields)
+            _touch(job)
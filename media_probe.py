@@ -0,0 +1,142 @@
+"""
+Single-call ffprobe with a persistent metadata cache.
+
+One ffprobe run with JSON output gives everything the renderer needs
+(display size, duration, rotation, codec, frame rate). Results are
+memoized by content hash in memory and in a small SQLite database, so a
+re-upload or a batch re-run of the same clip never probes again.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+
+from sqlite_db import SQLiteDB
+
+CACHE_DB = os.path.join('uploads', 'media_cache.db')
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ProbeError(Exception):
+    pass
+
+
+def hash_file(path):
+    """sha256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_rate(rate):
+    """'30000/1001' -> 29.97"""
+    try:
+        num, _, den = (rate or '').partition('/')
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def run_ffprobe(filepath):
+    """Probe the first video stream of filepath with one ffprobe call."""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries',
+        'stream=codec_name,width,height,duration,avg_frame_rate,r_frame_rate'
+        ':stream_tags=rotate:stream_side_data=rotation:format=duration',
+        '-of', 'json',
+        filepath
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ProbeError(f"ffprobe failed: {result.stderr.strip()}")
+
+    data = json.loads(result.stdout or '{}')
+    streams = data.get('streams') or []
+    if not streams:
+        raise ProbeError(f"No video stream in {filepath}")
+    stream = streams[0]
+
+    # Stream duration is often N/A in iPhone MOVs; the container has it
+    duration = _parse_float(stream.get('duration'))
+    if duration is None:
+        duration = _parse_float((data.get('format') or {}).get('duration'))
+    if duration is None:
+        raise ProbeError(f"Unknown duration for {filepath}")
+
+    # Older files carry a 'rotate' tag, newer ones a display matrix
+    rotation = _parse_float((stream.get('tags') or {}).get('rotate'))
+    if rotation is None:
+        for side_data in stream.get('side_data_list') or []:
+            rotation = _parse_float(side_data.get('rotation'))
+            if rotation is not None:
+                break
+    rotation = int(rotation or 0) % 360
+
+    width = int(stream.get('width') or 0)
+    height = int(stream.get('height') or 0)
+    if not width or not height:
+        raise ProbeError(f"Unknown frame size for {filepath}")
+
+    fps = _parse_rate(stream.get('avg_frame_rate')) or _parse_rate(stream.get('r_frame_rate'))
+
+    # ffmpeg auto-rotates on decode, so callers want the displayed size
+    display_width, display_height = (height, width) if rotation in (90, 270) else (width, height)
+
+    return {
+        "width": display_width,
+        "height": display_height,
+        "coded_width": width,
+        "coded_height": height,
+        "duration": duration,
+        "rotation": rotation,
+        "codec": stream.get('codec_name'),
+        "fps": fps,
+    }
+
+
+class ProbeCache(SQLiteDB):
+    def __init__(self, db_path=CACHE_DB):
+        super().__init__(db_path)
+        self._memory = {}
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS probes (content_hash TEXT PRIMARY KEY, info TEXT NOT NULL)"
+        )
+
+    def probe(self, filepath, content_hash=None):
+        """Metadata for filepath, probing only if this content hasn't been seen."""
+        content_hash = content_hash or hash_file(filepath)
+
+        info = self._memory.get(content_hash)
+        if info is not None:
+            return info
+
+        row = self._conn().execute(
+            "SELECT info FROM probes WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        if row:
+            info = json.loads(row[0])
+        else:
+            info = run_ffprobe(filepath)
+            self._conn().execute(
+                "INSERT OR REPLACE INTO probes(content_hash, info) VALUES (?, ?)",
+                (content_hash, json.dumps(info))
+            )
+
+        self._memory[content_hash] = info
+        return info
@@ -0,0 +1,191 @@
+"""
+Stage timing, trace ids and Prometheus metrics for the Flask server.
+
+Each request gets a trace id (taken from an incoming X-Request-Id header or
+generated). It lives in a context variable, so it follows the request into
+render jobs as long as they are submitted with a copied context (jobs.py
+does this). Every span and every log() line is prefixed with it, which ties
+"encode took 41.2s" back to the upload that caused it.
+
+Spans feed a histogram per stage. render() returns everything in the
+Prometheus text exposition format for the /metrics endpoint. The metric
+types are tiny hand-rolled versions of prometheus_client's so the server
+doesn't need another dependency.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a sub-millisecond cache hit up to a long archival encode
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_trace_id = contextvars.ContextVar('trace_id', default=None)
+_registry = []
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{v}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help, func=None):
+        """func, if given, is called at scrape time for the current value."""
+        self.name = name
+        self.help = help
+        self._func = func
+        self._value = 0
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    @contextmanager
+    def track(self):
+        """Gauge is raised for the duration of the with block."""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def collect(self):
+        value = self._func() if self._func else self._value
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ('le',)
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'notewall_stage_seconds', 'Time spent in each render pipeline stage.', labelnames=('stage',)
+)
+ENCODES_IN_FLIGHT = Gauge('notewall_encodes_in_flight', 'ffmpeg encodes currently running.')
+BYTES_IN = Counter('notewall_bytes_in_total', 'Uploaded bytes received.')
+BYTES_OUT = Counter('notewall_bytes_out_total', 'Bytes sent to clients.', labelnames=('kind',))
+
+
+def register_gauge(name, help, func):
+    """Gauge whose value is read from func at scrape time (e.g. queue depth)."""
+    return Gauge(name, help, func=func)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+# ── Tracing ───────────────────────────────────────────────
+
+def start_trace(trace_id=None):
+    """Begin a trace for the current request and return its id."""
+    trace_id = trace_id or os.urandom(6).hex()
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+def current_trace():
+    return _trace_id.get()
+
+
+def log(message):
+    """print, prefixed with the current trace id."""
+    trace_id = _trace_id.get()
+    print(f"[{trace_id}] {message}" if trace_id else message)
+
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage into STAGE_SECONDS and log how long it took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage)
+        log(f"{stage} took {elapsed * 1000:.1f} ms")
+
+
+def timed_stream(chunks, stage, kind):
+    """
+    Wrap a streamed response body: counts bytes out and records the time
+    from the first to the last chunk as one span. The generator runs after
+    the request handler returned, so the trace id is captured up front.
+    """
+    trace_id = _trace_id.get()
+
+    def generate():
+        _trace_id.set(trace_id)
+        with span(stage):
+            for chunk in chunks:
+                BYTES_OUT.inc(len(chunk), kind)
+                yield chunk
+
+    return generate()
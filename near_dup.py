@@ -0,0 +1,218 @@
+"""
+Near-duplicate detection for hooks with MinHash and LSH banding.
+
+Each hook is normalized (case, punctuation, whitespace) and broken into
+character shingles. A MinHash signature of NUM_PERM values estimates the
+Jaccard similarity between two hooks' shingle sets; the signature is cut
+into BANDS bands and each band is hashed into a bucket. Two hooks become
+candidates only if they share a bucket in at least one band, so a query
+touches a handful of rows instead of comparing against every hook.
+
+Signatures and band buckets live in SQLite, so the index persists between
+runs and grows incrementally: adding a hook that is already indexed is a
+cheap lookup by text.
+
+    python near_dup.py seed               # index used + scraped (dataset, hooks-copy) hooks
+    python near_dup.py query "some hook"  # show near-duplicates
+"""
+
+import hashlib
+import os
+import sys
+import zlib
+
+import numpy as np
+
+from hook_generation import dedupe_key
+from sqlite_db import SQLiteDB
+
+DB_FILE = 'near_dup.db'
+
+SHINGLE_SIZE = 4
+NUM_PERM = 128
+# 32 bands x 4 rows: pairs above ~0.45 similarity almost always collide
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity at which a candidate counts as a duplicate
+THRESHOLD = 0.6
+SEED = 1
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = np.random.RandomState(SEED)
+_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    item_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_lookup ON bands(band, bucket);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def shingles(text):
+    """Character shingles of the normalized text (the whole text if it is short)."""
+    norm = dedupe_key(text)
+    if len(norm) <= SHINGLE_SIZE:
+        return {norm} if norm else set()
+    return {norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """NUM_PERM-value MinHash signature of text as a uint64 array."""
+    grams = shingles(text)
+    if not grams:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    hashes = np.array([zlib.crc32(g.encode('utf-8')) for g in grams], dtype=np.uint64)
+    # One universal hash per permutation: (a * x + b) mod p, truncated to 32 bits
+    permuted = (np.outer(_A, hashes) + _B[:, None]) % _PRIME & _MAX_HASH
+    return permuted.min(axis=1)
+
+
+def band_buckets(signature):
+    """(band, bucket) pairs; bucket is a 63-bit hash of the band's rows."""
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        bucket = int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), 'big') >> 1
+        yield band, bucket
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+class NearDupIndex(SQLiteDB):
+    def __init__(self, db_path=DB_FILE):
+        super().__init__(db_path, wal=True)
+        self._conn().executescript(SCHEMA)
+        self._check_params()
+
+    def _check_params(self):
+        """Signatures are only comparable with identical parameters; start over if they changed."""
+        params = f"{SHINGLE_SIZE}:{NUM_PERM}:{BANDS}:{SEED}"
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+            if row and row[0] == params:
+                return
+            if row:
+                print("Near-dup parameters changed; clearing the index")
+                conn.execute("DELETE FROM items")
+                conn.execute("DELETE FROM bands")
+            conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('params', ?)", (params,))
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def query(self, text, threshold=THRESHOLD):
+        """Indexed hooks similar to text, as (text, source, similarity), most similar first."""
+        return self._query(minhash(text), threshold)
+
+    def _query(self, signature, threshold):
+        conn = self._conn()
+        candidate_ids = set()
+        for band, bucket in band_buckets(signature):
+            candidate_ids.update(
+                row[0] for row in conn.execute(
+                    "SELECT item_id FROM bands WHERE band = ? AND bucket = ?", (band, bucket)
+                )
+            )
+
+        matches = []
+        for item_id in candidate_ids:
+            text, source, blob = conn.execute(
+                "SELECT text, source, signature FROM items WHERE id = ?", (item_id,)
+            ).fetchone()
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint64))
+            if score >= threshold:
+                matches.append((text, source, score))
+        matches.sort(key=lambda m: m[2], reverse=True)
+        return matches
+
+    def find_duplicate(self, text, threshold=THRESHOLD):
+        """Most similar indexed hook as (text, source, similarity), or None."""
+        matches = self.query(text, threshold)
+        return matches[0] if matches else None
+
+    def add(self, text, source):
+        """Index text. Returns False if exactly this text was already indexed."""
+        return self.add_many([text], source) == 1
+
+    def add_many(self, texts, source):
+        """Index every text not yet indexed, in one transaction. Returns how many were added."""
+        conn = self._conn()
+        new_texts = []
+        seen = set()
+        for text in texts:
+            text = text.strip()
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            if conn.execute("SELECT 1 FROM items WHERE text = ?", (text,)).fetchone() is None:
+                new_texts.append(text)
+
+        if not new_texts:
+            return 0
+
+        with self._transaction() as conn:
+            for text in new_texts:
+                signature = minhash(text)
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO items(text, source, signature) VALUES (?, ?, ?)",
+                    (text, source, signature.tobytes())
+                )
+                if cur.rowcount != 1:
+                    continue
+                conn.executemany(
+                    "INSERT INTO bands(band, bucket, item_id) VALUES (?, ?, ?)",
+                    [(band, bucket, cur.lastrowid) for band, bucket in band_buckets(signature)]
+                )
+        return len(new_texts)
+
+
+def seed_index(index, used_texts=(), scraped_texts=()):
+    """Bring the index up to date with the used history and scraped corpora."""
+    added_used = index.add_many(used_texts, 'used')
+    added_scraped = index.add_many(scraped_texts, 'scraped')
+    print(f"Near-dup index: +{added_used} used, +{added_scraped} scraped, {len(index)} total")
+
+
+def scraped_hook_texts():
+    """Hook texts from the Excel dataset and the hooks-copy scrape, whichever are present."""
+    from hook_dataset import EXCEL_FILE, load_dataset
+    from hooks_corpus import open_corpus
+
+    if os.path.exists(EXCEL_FILE):
+        yield from (str(h) for h in load_dataset()["hook"])
+    corpus = open_corpus()
+    if corpus is not None:
+        yield from (record.text for record in corpus)
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'seed'
+    index = NearDupIndex()
+    if command == 'seed':
+        from hook_store import HookStore
+        store = HookStore()
+        store.sync_from_json()
+        seed_index(index, [h['text'] for h in store.used_hooks()], scraped_hook_texts())
+    elif command == 'query' and len(sys.argv) > 2:
+        for text, source, score in index.query(sys.argv[2]):
+            print(f"{score:.2f}  [{source}]  {text}")
+    else:
+        print('Usage: python near_dup.py [seed|query "hook text"]')
+        sys.exit(1)
@@ -0,0 +1,120 @@
+"""
+Deduplicated cache of rendered shorts.
+
+A render is fully determined by (input content hash, hook text, encode
+profile), so that triple is hashed into the cache key and the output file
+is named after it. Lookups go by (input hash, emotion, profile): an
+operator re-uploading the same clip with the same emotion gets the earlier
+render back immediately instead of paying for another encode.
+
+The index lives in SQLite under uploads/, next to the probe cache, and not
+in the output folder, whose files are all downloadable. Once the cached
+files exceed max_bytes, the least recently served ones are deleted.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from sqlite_db import SQLiteDB
+
+CACHE_DB = os.path.join('uploads', 'output_cache.db')
+MAX_BYTES = int(os.environ.get('OUTPUT_CACHE_MAX_BYTES', 5 * 1024 * 1024 * 1024))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    key TEXT PRIMARY KEY,
+    input_hash TEXT NOT NULL,
+    emotion TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    hook_text TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_lookup ON outputs(input_hash, emotion, profile, last_access);
+CREATE INDEX IF NOT EXISTS outputs_lru ON outputs(last_access);
+"""
+
+
+def output_key(input_hash, hook_text, profile):
+    payload = json.dumps([input_hash, hook_text, profile], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class OutputCache(SQLiteDB):
+    row_factory = sqlite3.Row
+
+    def __init__(self, output_dir, max_bytes=MAX_BYTES, db_path=CACHE_DB):
+        super().__init__(db_path, wal=True)
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn().executescript(SCHEMA)
+
+    def lookup(self, input_hash, emotion, profile):
+        """Most recent cached render for this input/emotion/profile, or None."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT * FROM outputs WHERE input_hash = ? AND emotion = ? AND profile = ? "
+            "ORDER BY last_access DESC LIMIT 1",
+            (input_hash, emotion, profile)
+        ).fetchone()
+
+        if row is not None and not os.path.exists(os.path.join(self.output_dir, row['filename'])):
+            # File was removed behind our back
+            conn.execute("DELETE FROM outputs WHERE key = ?", (row['key'],))
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        conn.execute("UPDATE outputs SET last_access = ? WHERE key = ?", (time.time(), row['key']))
+        return dict(row)
+
+    def store(self, key, input_hash, emotion, profile, hook_text, filename):
+        """Record a finished render and evict old ones if over budget."""
+        size = os.path.getsize(os.path.join(self.output_dir, filename))
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO outputs "
+            "(key, input_hash, emotion, profile, hook_text, filename, size, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, input_hash, emotion, profile, hook_text, filename, size, time.time())
+        )
+        self._evict(keep=key)
+
+    def _evict(self, keep):
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM outputs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for row in conn.execute("SELECT key, filename, size FROM outputs ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            if row['key'] == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.output_dir, row['filename']))
+            except OSError:
+                pass
+            conn.execute("DELETE FROM outputs WHERE key = ?", (row['key'],))
+            total -= row['size']
+
+    def stats(self):
+        row = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM outputs").fetchone()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": row[0],
+                "bytes": row[1],
+            }
@@ -0,0 +1,142 @@
+"""
+Content-addressed cache for rendered hook overlays.
+
+Overlays depend only on the hook text, frame size, font and styling, and the
+hook library is small, so the same PNG gets rendered over and over. Entries
+are keyed by a hash of those inputs and kept in two tiers:
+
+  * memory - LRU of encoded PNG bytes, bounded by total bytes
+  * disk   - PNG files under CACHE_DIR (ffmpeg needs a path), evicted
+             oldest-access-first once the directory exceeds its byte budget
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from file_utils import atomic_write
+
+CACHE_DIR = os.path.join('uploads', 'overlay_cache')
+MEMORY_LIMIT_BYTES = 64 * 1024 * 1024
+DISK_LIMIT_BYTES = 512 * 1024 * 1024
+
+
+def overlay_key(text, width, height, font, style):
+    """Stable hash of everything that affects the rendered overlay."""
+    payload = json.dumps([text, width, height, font, style], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class OverlayCache:
+    def __init__(self, cache_dir=CACHE_DIR, memory_limit=MEMORY_LIMIT_BYTES,
+                 disk_limit=DISK_LIMIT_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._disk_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(cache_dir)
+            if entry.name.endswith('.png')
+        )
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def get_path(self, key, render):
+        """
+        Return the path of the cached PNG for key.
+
+        render() is only called on a full miss and must return PNG bytes.
+        """
+        path = self._path(key)
+
+        with self._lock:
+            png = self._memory.get(key)
+            if png is not None:
+                self._memory.move_to_end(key)
+
+        if png is None and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    png = f.read()
+                os.utime(path)
+            except OSError:
+                # Evicted between the exists() check and the read
+                png = None
+            else:
+                self._remember(key, png)
+                self.hits += 1
+                return path
+
+        if png is not None:
+            self.hits += 1
+            # Disk copy may have been evicted while the bytes stayed in memory
+            if not os.path.exists(path):
+                self._write(path, png)
+            else:
+                os.utime(path)
+            return path
+
+        self.misses += 1
+        png = render()
+        self._remember(key, png)
+        self._write(path, png)
+        return path
+
+    def _remember(self, key, png):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = png
+            self._memory_bytes += len(png)
+            while self._memory_bytes > self.memory_limit and len(self._memory) > 1:
+                _, old = self._memory.popitem(last=False)
+                self._memory_bytes -= len(old)
+
+    def _write(self, path, png):
+        # Write to a temp name and rename so concurrent renders never hand
+        # ffmpeg a half-written file
+        with atomic_write(path) as f:
+            f.write(png)
+
+        with self._lock:
+            self._disk_bytes += len(png)
+            if self._disk_bytes > self.disk_limit:
+                self._evict_disk(keep=path)
+
+    def _evict_disk(self, keep):
+        """Delete least recently used PNGs until under the disk budget. Caller holds _lock."""
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith('.png')]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        for entry in entries:
+            if total <= self.disk_limit:
+                break
+            if entry.path == keep:
+                continue
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
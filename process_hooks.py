@@ -1,76 +1,67 @@
 import os
-import openpyxl
 import json
 import random
-from google import genai
+import numpy as np
 from dotenv import load_dotenv
 
+from file_utils import file_signature
+from hook_dataset import EXCEL_FILE, load_dataset, score_hooks, top_k
+from hook_generation import EMOTIONS, generate_hooks, make_client
+from hook_store import HookStore
+from hooks_corpus import open_corpus
+from near_dup import NearDupIndex, seed_index
+
 # Load environment variables
 load_dotenv()
 
+# Point at a generateContent-compatible endpoint (e.g. gemini_stub.py) instead of the SDK
+base_url = os.environ.get("GEMINI_BASE_URL")
+
 api_key = os.environ.get("GEMINI_API_KEY")
-if not api_key:
+if not api_key and not base_url:
     raise ValueError("GEMINI_API_KEY environment variable not set.")
 
 # Initialize Gemini client
-client = genai.Client(api_key=api_key)
+client = make_client(api_key, model="gemini-2.0-flash", base_url=base_url)
+
+# One shard per emotion, generated concurrently: 5 x 20 = 100 hooks
+HOOKS_PER_EMOTION = 20
+
+# Inspiration hooks in the prompt: top dataset hooks plus a random sample
+# of the hooks-copy scrape (when it is present)
+INSPIRATION_HOOKS = 150
+CORPUS_INSPIRATION_HOOKS = 30
 
 # Excel File Path
-excel_file = "[Social Growth Engineers] Education & Productivity Hooks Dataset.xlsx"
+excel_file = EXCEL_FILE
+
+# How source hooks are ranked: "views", or "engagement" to weight in likes/comments
+SCORER = "views"
+MIN_HOOK_LENGTH = 10
 
 try:
-    wb = openpyxl.load_workbook(excel_file)
-    ws = wb.active
+    # Columnar cache of the workbook, rebuilt only when the .xlsx changes
+    dataset = load_dataset(excel_file)
     
-    # Column Indices (0-based) based on previous analysis
-    # ('Username', 'Video URL', 'Hook', 'Caption', 'Duration', 'Posted At', 'Views', 'Likes', 'Comments', ...)
-    HOOK_COL = 2
-    VIEWS_COL = 6
-    
-    # Start reading data
-    DATA_START_ROW = 4
-    
-    candidates = []
+    # Keep the dataset searchable (/hooks/search); re-indexed only when the workbook changed
+    store = HookStore()
+    store.sync_scraped('dataset', file_signature(excel_file), (str(h) for h in dataset["hook"]))
     
     print(f"Reading and analyzing viral hooks from {excel_file}...")
     
-    for row in ws.iter_rows(min_row=DATA_START_ROW, values_only=True):
-        if not row or len(row) <= VIEWS_COL:
-            continue
-            
-        hook_text = row[HOOK_COL]
-        views = row[VIEWS_COL]
-        
-        # Validation
-        if not hook_text or not isinstance(hook_text, str) or len(hook_text.strip()) < 10:
-            continue
-            
-        # Clean views data (sometimes it might be a string or blank)
-        # Try to parse views as float
-        v = 0.0
-        try:
-            if isinstance(views, str):
-                views = views.replace(',', '')
-                if 'k' in views.lower():
-                    v = float(views.lower().replace('k', '')) * 1000
-                elif 'm' in views.lower():
-                    v = float(views.lower().replace('m', '')) * 1000000
-                else:
-                    v = float(views)
-            elif isinstance(views, (int, float)):
-                v = float(views)
-        except (ValueError, TypeError):
-            v = 0.0
-            
-        candidates.append({
-            "hook": hook_text.strip(),
-            "views": v
-        })
-    
-    print(f"Found {len(candidates)} total hooks.")
+    # Whole-column parsing and scoring; drop hooks too short to be useful
+    hooks = np.char.strip(dataset["hook"])
+    valid = np.char.str_len(hooks) >= MIN_HOOK_LENGTH
+    hooks = hooks[valid]
+    scores = score_hooks(dataset, SCORER)[valid]
+    
+    print(f"Found {len(hooks)} total hooks.")
 
-    # Sort by views (descending) to get the most viral ones
-    candidates.sort(key=lambda x: x["views"], reverse=True)
+    # Partial selection of the 1000 best (by SCORER), most viral first
+    candidates = [
+        {"hook": str(hooks[i]), "score": float(scores[i])}
+        for i in top_k(scores, 1000)
+    ]
     
     # Take top 30 most viral hooks
     # If not enough viral ones, take whatever we have
@@ -78,12 +69,12 @@ try:
     
     if not top_candidates:
         print("No valid hooks found! Using generic fallback.")
-        top_candidates = [{"hook": "Generic hook about productivity"}]
+        top_candidates = [{"hook": "Generic hook about productivity", "score": 0.0}]
     
-    print(f"Selected top {len(top_candidates)} viral hooks based on view count.")
+    print(f"Selected top {len(top_candidates)} viral hooks by {SCORER}.")
     # Show top 3 for debug
     for i, c in enumerate(top_candidates[:3]):
-        print(f"#{i+1}: {c['views']} views - {c['hook']}")
+        print(f"#{i+1}: {c['score']:,.0f} {SCORER} - {c['hook']}")
     
     # Prepare the hooks for the prompt
     # Get top viral hooks to use as inspiration
@@ -91,23 +82,30 @@ try:
     top_1000 = candidates[:1000]
     random.shuffle(top_1000)
     
+    # Mix in random scraped hooks; the offset index makes the sample a few reads
+    corpus = open_corpus()
+    corpus_hooks = [r.text for r in corpus.sample(CORPUS_INSPIRATION_HOOKS)] if corpus else []
+    
     # Send 150 diverse high-performing hooks as examples
-    hooks_to_send = [c['hook'] for c in top_1000[:150]]
+    hooks_to_send = [c['hook'] for c in top_1000[:INSPIRATION_HOOKS - len(corpus_hooks)]] + corpus_hooks
     hooks_str = "\n".join([f"- {h}" for h in hooks_to_send])
     
-    prompt = f"""
+    def build_prompt(emotion, count):
+        return f"""
     You are a viral content strategist for **NoteWall**, an iOS app that puts notes/to-do lists directly on your lock screen wallpaper.
     
     **The Goal:**
-    Create a library of **100 VIRAL HOOKS** for UGC (User Generated Content) ads featuring a **MALE creator**.
+    Create **{count} VIRAL HOOKS** for UGC (User Generated Content) ads featuring a **MALE creator**.
+    Every hook in this batch uses the same emotion.
+    
+    **Emotion for this batch:** {emotion}
     
     **Target Audience & Persona:**
     - **Persona:** Male, relatable, productivity-focused, direct, "bro-to-bro" advice.
     - **Tone:** Shocked, Frustrated, Urgent, Skeptical, High Energy.
     - **AVOID:** "Aesthetic", "Cozy", "Cute", "Satisfying", "Soft", "Pretty". Do NOT use words like "obsession", "literally dying", "so aesthetic". 
     
-    **Categorization Task:**
-    For each hook, you MUST assign one of the following 5 EMOTIONS that convert best for male-led productivity UGC:
+    **Emotions** (the 5 that convert best for male-led productivity UGC; write only {emotion} hooks):
     1. **Shocked** (Disbelief, "Wait, this exists?", "My life is a lie", "WTF")
     2. **Frustrated** (Relatable pain, "I'm so done with...", "Why is this so hard?", "Stop struggling")
     3. **Skeptical** (Cynical turned believer, "I thought this was fake", "Actually useful?", "No way")
@@ -123,10 +121,10 @@ try:
     
     **Transformation Task:**
     I have provided 150 proven viral hooks from other productivity/student videos below.
-    Use these as structural inspiration to create 100 UNIQUE hooks for NoteWall.
+    Use these as structural inspiration to create {count} UNIQUE hooks for NoteWall.
     
     **Requirements:**
-    - **Quantity:** EXACTLY 100 hooks.
+    - **Quantity:** EXACTLY {count} hooks.
     - **Length:** Short and punchy (must be readable in 2 seconds).
     - **Tone:** Masculine, Authentic, "TikTok Native".
     - **Format:** JSON Array of OBJECTS.
@@ -136,69 +134,42 @@ try:
     {hooks_str}
     
     **Output:**
-    Return ONLY a raw JSON array of objects.
+    Return ONLY a raw JSON array of objects, each with "text" and "emotion": "{emotion}".
     Example:
     [
       {{"text": "I was today years old finding THIS?! \ud83e\udd2f", "emotion": "Shocked"}},
-      {{"text": "Stop using the default notes app! It's trash.", "emotion": "Frustrated"}},
-      {{"text": "I thought this app was a scam... I was wrong.", "emotion": "Skeptical"}},
-      {{"text": "If you have ADHD, download this NOW.", "emotion": "Urgent"}},
       {{"text": "This iPhone hack feels illegal.", "emotion": "Life Hack"}}
     ]
-    (Strictly adhere to the 5 categories: Shocked, Frustrated, Skeptical, Urgent, Life Hack. NO Aesthetic hooks.)
+    (NO Aesthetic hooks.)
     """
 
-    print("Sending to Gemini for personalization...")
-    
-    # Use a supported model
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[prompt]
-    )
-    
-    response_text = response.text
+    print(f"Sending {len(EMOTIONS)} shards to Gemini for personalization...")
+    
+    # Shards run concurrently with per-shard retry, timeout and hedging;
+    # results come back cleaned, emotion-normalized and deduplicated
+    final_hooks = generate_hooks(client, build_prompt, EMOTIONS, HOOKS_PER_EMOTION)
+    
+    if not final_hooks:
+        raise RuntimeError("Every generation shard failed; top_hooks.json left unchanged.")
+    
+    # Reject near-duplicates of hooks already posted, of the scraped dataset
+    # and of earlier generations (including the rest of this batch)
+    near_dups = NearDupIndex()
+    store.sync_from_json()
+    scraped = [str(h) for h in dataset["hook"]] + ([r.text for r in corpus] if corpus else [])
+    seed_index(near_dups, [h['text'] for h in store.used_hooks()], scraped)
+    
+    fresh_hooks = []
+    for hook in final_hooks:
+        match = near_dups.find_duplicate(hook["text"])
+        if match:
+            print(f"   near-duplicate of {match[1]} hook ({match[2]:.2f}): {hook['text']!r} ~ {match[0]!r}")
+            continue
+        near_dups.add(hook["text"], 'generated')
+        fresh_hooks.append(hook)
     
-    # Clean up markdown
-    if "```json" in response_text:
-        response_text = response_text.split("```json")[1].split("```")[0].strip()
-    elif "```" in response_text:
-        response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-    final_hooks = json.loads(response_text)
-    
-    # Post-process to ensure consistent keys and remove bad hashtags
-    clean_hooks = []
-    
-    valid_emotions = ["Shocked", "Frustrated", "Skeptical", "Urgent", "Life Hack"]
-    
-    for item in final_hooks:
-        if isinstance(item, str):
-            # If AI messed up and returned strings, try to categorize simply
-            text = item
-            emotion = "Life Hack" # Default
-            if "?" in text or "!" in text: emotion = "Shocked"
-            clean_hooks.append({"text": text.replace("#NoteWall", "").strip(), "emotion": emotion})
-        elif isinstance(item, dict):
-            text = item.get("text", "")
-            emotion = item.get("emotion", "Life Hack")
-            
-            # Normalization
-            emotion = emotion.capitalize()
-            if "Life" in emotion or "Hack" in emotion: emotion = "Life Hack" # Handle space naming issues
-            
-            if emotion not in valid_emotions:
-                # Map close enough
-                if "Relie" in emotion: emotion = "Life Hack" 
-                elif "Urg" in emotion or "Fear" in emotion: emotion = "Urgent"
-                elif "Mind" in emotion: emotion = "Shocked"
-                elif "Anger" in emotion or "Hate" in emotion: emotion = "Frustrated"
-                elif "Curious" in emotion: emotion = "Skeptical"
-                else: emotion = "Life Hack"
-                
-            if text:
-                clean_hooks.append({"text": text.replace("#NoteWall", "").strip(), "emotion": emotion})
-                
-    final_hooks = clean_hooks
+    print(f"Rejected {len(final_hooks) - len(fresh_hooks)} near-duplicate hooks.")
+    final_hooks = fresh_hooks
     
     print(f"Generated {len(final_hooks)} personalized high-performance hooks.")
     
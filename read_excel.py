@@ -8,12 +8,14 @@ if not os.path.exists(file_path):
     exit(1)
 
 try:
-    wb = openpyxl.load_workbook(file_path)
+    # Read-only mode streams rows instead of loading the whole workbook
+    wb = openpyxl.load_workbook(file_path, read_only=True)
     ws = wb.active
     print("--- SCANNING FIRST 20 ROWS ---")
     for i, row in enumerate(ws.iter_rows(max_row=20, values_only=True)):
         # Check if row has any content
         if any(row):
             print(f"Row {i+1}: {row}")
+    wb.close()
 except Exception as e:
     print(f"Error: {e}")
@@ -1,15 +1,37 @@
 import subprocess
-from flask import Flask, jsonify, request, send_from_directory, send_file, send_file
+from flask import Flask, Response, jsonify, request, send_file
+from urllib.parse import quote
+from werkzeug.utils import safe_join
 import os
-import random
-import json
 import textwrap
-import zipfile
+import json
+import hashlib
 import io
+import re
+import contextvars
+import gzip
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 # Removed moviepy import as we now use ffmpeg subprocess
 # from moviepy import VideoFileClip, ImageClip, CompositeVideoClip
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+import fonts
+import hooks_corpus
+import jobs
+import metrics
+from file_utils import file_signature
+from hook_index import HookIndex
+from hook_store import HookStore
+from media_probe import ProbeCache, hash_file
+from output_cache import OutputCache, output_key
+import zip_stream
+from overlay_cache import OverlayCache, overlay_key
 
 app = Flask(__name__)
 
@@ -18,6 +40,51 @@ UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'generated_shorts'
 HOOKS_FILE = 'top_hooks.json'
 USED_HOOKS_FILE = 'used_hooks.json'
+HOOKS_DB_FILE = 'hooks.db'
+SCRAPED_HOOKS_FILE = 'hooks-copy'
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Named x264 encode profiles. Everything here is part of the output cache key.
+# scale shrinks the output relative to the source (previews only).
+ENCODE_PROFILES = {
+    "preview": {"preset": "ultrafast", "crf": 30, "tune": "fastdecode", "threads": 0, "scale": 0.5},
+    "standard": {"preset": "veryfast", "crf": 23, "tune": None, "threads": 0, "scale": 1.0},
+    "archival": {"preset": "slow", "crf": 18, "tune": "film", "threads": 0, "scale": 1.0},
+}
+DEFAULT_PROFILE = "standard"
+PREVIEW_PROFILE = "preview"
+
+# How many of a batch's items render at once (overridable per request, capped
+# here). Batch items also share jobs.MAX_RENDER_WORKERS with every other render,
+# so raising this past that limit only queues the extra items.
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 3))
+BATCH_ID_RE = re.compile(r'^[A-Za-z0-9_]{1,32}$')
+
+# Seconds between keepalive comments on idle event streams
+SSE_KEEPALIVE = 15
+
+# Listing pages; bodies smaller than this aren't worth compressing
+LIST_DEFAULT_LIMIT = 100
+LIST_MAX_LIMIT = 500
+COMPRESS_MIN_BYTES = 1024
+
+SEARCH_STATUSES = ('active', 'claimed', 'used', 'scraped')
+SEARCH_MAX_LIMIT = 100
+
+# How /download hands files to the client:
+#   ""            Flask sends it. Whole-file responses can use the WSGI server's
+#                 file_wrapper, but Range (206) bodies are read and copied in Python.
+#   "x-sendfile"  Apache/lighttpd send it from the X-Sendfile header
+#   "x-accel"     nginx sends it from an internal location (X-Accel-Redirect)
+# In production use one of the offload modes so large videos and seeks never
+# pass through Python; the default suits running the dev server alone.
+DOWNLOAD_OFFLOAD = os.environ.get('DOWNLOAD_OFFLOAD', '')
+# nginx location that aliases OUTPUT_FOLDER, marked `internal`
+X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX', '/internal/generated_shorts/')
+# Output names are content-addressed, so a filename never changes contents
+DOWNLOAD_MAX_AGE = 24 * 60 * 60
+
+app.config['USE_X_SENDFILE'] = DOWNLOAD_OFFLOAD == 'x-sendfile'
 
 # Ensure directories exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -30,135 +97,135 @@ HOOK_TEXT_COLOR = (255, 255, 255)
 ACCENT_COLOR = (167, 139, 250)
 BG_COLOR = (0, 0, 0)
 
+# Hook overlay styling. Part of the overlay cache key, so changing any of
+# these naturally invalidates previously cached overlays.
+OVERLAY_STYLE = {
+    "font_size": 110,
+    "max_chars": 30,
+    "stroke_width": 5,
+    "y_ratio": 0.25,
+}
+
+overlay_cache = OverlayCache()
+probe_cache = ProbeCache()
+output_cache = OutputCache(OUTPUT_FOLDER)
+
+# Hooks live in SQLite; the JSON files are imported whenever they change
+hook_store = HookStore(HOOKS_DB_FILE)
+hook_store.sync_from_json(HOOKS_FILE, USED_HOOKS_FILE)
+hook_store.release_all_claims()
+
+# Scraped hooks are searchable next to the library; re-indexed only when the scrape changes
+if os.path.exists(SCRAPED_HOOKS_FILE):
+    hook_store.sync_scraped('hooks-copy', file_signature(SCRAPED_HOOKS_FILE),
+                            (r.text for r in hooks_corpus.parse_corpus(SCRAPED_HOOKS_FILE)))
+
+# Scraped at /metrics time
+metrics.register_gauge('notewall_render_queue_depth', 'Render jobs waiting for a worker.', jobs.queue_depth)
+
+# Discover fonts once at startup rather than on the first render
+print(f"Using font: {fonts.find_font() or 'Pillow default'}")
+
+def sync_hooks():
+    """Import top_hooks.json / used_hooks.json if they changed on disk."""
+    try:
+        hook_store.sync_from_json(HOOKS_FILE, USED_HOOKS_FILE)
+    except Exception as e:
+        print(f"Error syncing hooks: {e}")
+
 def load_hooks():
+    """Active hook library, picking up top_hooks.json if it changed on disk."""
+    sync_hooks()
     try:
-        with open(HOOKS_FILE, 'r') as f:
-            hooks = json.load(f)
-            # Ensure format is consistently objects
-            normalized = []
-            for h in hooks:
-                if isinstance(h, str):
-                    normalized.append({"text": h, "emotion": "General"})
-                elif isinstance(h, dict):
-                    normalized.append(h)
-            return normalized
+        return hook_store.active_hooks()
     except Exception as e:
         print(f"Error loading hooks: {e}")
         return []
 
+# Active hooks resident in memory, reloaded only when the hook files change
+hook_index = HookIndex(
+    loader=load_hooks,
+    signature=lambda: (file_signature(HOOKS_FILE), file_signature(USED_HOOKS_FILE))
+)
+
 def load_used_hooks():
     try:
-        if not os.path.exists(USED_HOOKS_FILE):
-             return []
-        with open(USED_HOOKS_FILE, 'r') as f:
-            return json.load(f)
+        return hook_store.used_hooks()
     except Exception as e:
         print(f"Error loading used hooks: {e}")
         return []
 
 def mark_hook_as_used(hook):
-    """Move hook from top_hooks.json to used_hooks.json"""
+    """Move hook from the active library to the used history"""
     try:
-        # Load both
-        all_hooks = load_hooks()
-        used = load_used_hooks()
-        
-        # Remove from active
-        # Use simple text matching
-        updated_active = [h for h in all_hooks if h['text'] != hook['text']]
-        
-        # Add to used
-        hook['used_at'] = str(os.urandom(4).hex()) # Simple timestamp placeholder or random ID
-        used.insert(0, hook)
-        
-        # Save both
-        with open(HOOKS_FILE, 'w') as f:
-            json.dump(updated_active, f, indent=2)
-            
-        with open(USED_HOOKS_FILE, 'w') as f:
-            json.dump(used, f, indent=2)
-            
+        with metrics.span("hook_bookkeeping"):
+            hook_store.consume(hook)
     except Exception as e:
-        print(f"Error marking hook as used: {e}")
-
+        metrics.log(f"Error marking hook as used: {e}")
+
+def select_hook(target_emotion):
+    """Pick a random hook for the emotion and claim it so no concurrent render reuses it."""
+    with metrics.span("hook_select"):
+        return _select_hook(target_emotion)
+
+def _select_hook(target_emotion):
+    hook_index.refresh()
+
+    while True:
+        # Falls back to the full pool if the emotion has no hooks
+        selected_hook = hook_index.choose(target_emotion)
+        if selected_hook is None:
+            raise Exception("No hooks found in database")
+
+        # Claimed now, or already taken by another worker; not selectable either way
+        hook_index.discard(selected_hook)
+        if hook_store.claim(selected_hook['text']):
+            return selected_hook
+
+def release_hook(hook):
+    """Return a claimed hook to the pool after a failed render."""
+    with metrics.span("hook_bookkeeping"):
+        hook_store.release(hook['text'])
+        hook_index.add(hook)
+
+def get_video_duration_and_size(filepath, content_hash=None):
+    """Displayed width, height and duration of a video, probed once per content hash."""
+    # Raises media_probe.ProbeError rather than guessing a size for unreadable files
+    with metrics.span("probe"):
+        info = probe_cache.probe(filepath, content_hash)
+    return info['width'], info['height'], info['duration']
+
+def create_text_overlay(text, duration, video_size, scale=1.0):
+    """
+    Return the path of a text overlay image, rendering it only on a cache miss.
+    scale shrinks the text along with a downscaled (preview) frame.
+    """
+    width, height = video_size
+    font_path = fonts.find_font()
+    key = overlay_key(text, width, height, font_path, dict(OVERLAY_STYLE, scale=scale))
 
-def find_font():
-    """Find a suitable bold font on the system."""
-    font_paths = [
-        "/System/Library/Fonts/HelveticaNeue.ttc",
-        "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
-        "/Library/Fonts/Arial Bold.ttf",
-        "/System/Library/Fonts/SFCompactRounded-Bold.otf" 
-    ]
-    for fp in font_paths:
-        if os.path.exists(fp):
-            return fp
-    return None
+    def render():
+        img = render_text_overlay(text, video_size, font_path, scale)
+        buf = io.BytesIO()
+        img.save(buf, format='PNG')
+        return buf.getvalue()
 
-def get_video_duration_and_size(filepath):
-    """Use ffprobe to get video duration and dimensions."""
-    try:
-        cmd = [
-            'ffprobe', 
-            '-v', 'error', 
-            '-select_streams', 'v:0', 
-            '-show_entries', 'stream=width,height,duration', 
-            '-of', 'default=noprint_wrappers=1:nokey=1', 
-            filepath
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        # Output format should be: width\nheight\nduration
-        parts = result.stdout.strip().split('\n')
-        if len(parts) >= 3:
-            w = int(parts[0])
-            h = int(parts[1])
-            try:
-                d = float(parts[2])
-            except ValueError:
-                 # sometimes duration is N/A in stream, try format
-                 cmd2 = [
-                    'ffprobe', 
-                    '-v', 'error', 
-                    '-show_entries', 'format=duration', 
-                    '-of', 'default=noprint_wrappers=1:nokey=1', 
-                    filepath
-                 ]
-                 res2 = subprocess.run(cmd2, capture_output=True, text=True)
-                 d = float(res2.stdout.strip())
-            return w, h, d
-        return 1080, 1920, 60.0 # Fallback
-    except Exception as e:
-        print(f"Error getting video info: {e}")
-        return 1080, 1920, 60.0
+    with metrics.span("overlay"):
+        return overlay_cache.get_path(key, render)
 
-def create_text_overlay(text, duration, video_size):
-    """Create a text overlay image."""
+def render_text_overlay(text, video_size, font_path, scale=1.0):
+    """Rasterize the hook text onto a transparent full-frame image."""
     width, height = video_size
     img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
 
-    font_path = find_font()
-    font_size = 110 # Bigger font size
+    font_size = round(OVERLAY_STYLE["font_size"] * scale) # Bigger font size
     
-    font = ImageFont.load_default()
-    try:
-        if font_path:
-            # Check if it's Helvetica or similar .ttc
-            if font_path.endswith('.ttc'):
-                 # Index 0 usually Regular, let's try to find Bold if possible or just use a larger size
-                 # Actually HelveticaNeue.ttc index 1 is usually Bold.
-                 try:
-                    font = ImageFont.truetype(font_path, font_size, index=1)
-                 except:
-                    font = ImageFont.truetype(font_path, font_size, index=0)
-            else:
-                 font = ImageFont.truetype(font_path, font_size)
-    except Exception as e:
-        print(f"Font load error: {e}")
-        font = ImageFont.load_default()
+    # Loaded once per (path, size) by the font registry
+    font = fonts.load_font(font_size, font_path)
 
     # Word wrap
-    max_chars = 30 # Wider text area (was 15)
+    max_chars = OVERLAY_STYLE["max_chars"] # Wider text area (was 15)
     wrapped = textwrap.fill(text, width=max_chars)
 
     # Calculate text position
@@ -168,10 +235,10 @@ def create_text_overlay(text, duration, video_size):
     
     x = (width - text_width) // 2
     # Position higher: around 25% from top
-    y = int(height * 0.25) - (text_height // 2)
+    y = int(height * OVERLAY_STYLE["y_ratio"]) - (text_height // 2)
 
     # Outline (Stroke)
-    stroke_width = 5 
+    stroke_width = max(1, round(OVERLAY_STYLE["stroke_width"] * scale))
     
     # Draw Text with outline
     try:
@@ -198,38 +265,82 @@ def create_text_overlay(text, duration, video_size):
             stroke_fill="black"
         )
 
+    return img
 
-    # Save temp unique
-    temp_overlay_filename = f"overlay_{os.urandom(4).hex()}.png"
-    temp_overlay = os.path.join(UPLOAD_FOLDER, temp_overlay_filename)
-    img.save(temp_overlay)
-    
-    return temp_overlay
+def generate_video_internal(filepath, emotion, input_hash=None, profile=DEFAULT_PROFILE,
+                            with_preview=False):
+    """
+    Core logic to generate video from file and emotion.
 
-def generate_video_internal(filepath, emotion):
-    """Core logic to generate video from file and emotion."""
-    all_hooks = load_hooks()
-    
-    # Filter by emotion
+    with_preview first renders a fast low-res preview with the same hook and
+    publishes it on the running job, then renders the requested profile
+    (skipped when the requested profile is the preview profile itself).
+    """
     target_emotion = emotion.capitalize()
-    
-    # Handle emotion variations or fallback mapping
-    # Actually the hooks file should be clean now, but just in case
-    candidates = [h for h in all_hooks if h.get('emotion') == target_emotion]
-    if not candidates:
-        # Fallback to general or any if exact match fails
-        # Try looking for "Life Hack" if "Life Hack" fails due to space/case
-        candidates = all_hooks
-
-    if not candidates:
-        raise Exception("No hooks found in database")
-        
-    selected_hook = random.choice(candidates)
+    input_hash = input_hash or hash_file(filepath)
+
+    # Same clip, same emotion, same encode settings: hand back the earlier render
+    cached = output_cache.lookup(input_hash, target_emotion, encode_profile_id(profile))
+    if cached:
+        metrics.log(f"Output cache hit: {cached['filename']}")
+        return os.path.join(OUTPUT_FOLDER, cached['filename']), cached['hook_text'], cached['filename']
+
+    selected_hook = select_hook(target_emotion)
     hook_text = selected_hook['text']
-    
+
+    try:
+        if with_preview and profile != PREVIEW_PROFILE:
+            _, preview_filename = render_cached(filepath, input_hash, target_emotion, hook_text, PREVIEW_PROFILE)
+            jobs.update_current_job(preview_url=f"/download/{preview_filename}", hook_text=hook_text)
+
+        output_path, output_filename = render_cached(filepath, input_hash, target_emotion, hook_text, profile)
+    except Exception:
+        # Give the hook back so a failed render doesn't burn it
+        release_hook(selected_hook)
+        raise
+
+    # Mark as used after successful generation
+    mark_hook_as_used(selected_hook)
+
+    return output_path, hook_text, output_filename
+
+def render_cached(filepath, input_hash, target_emotion, hook_text, profile):
+    """Render with one profile and record it in the output cache. Returns (path, filename)."""
+    profile_id = encode_profile_id(profile)
+    key = output_key(input_hash, hook_text, profile_id)
+    output_filename = f"hook_{target_emotion}_{profile}_{key[:16]}.mp4"
+    output_path = render_hook_video(filepath, hook_text, output_filename, input_hash, profile)
+    output_cache.store(key, input_hash, target_emotion, profile_id, hook_text, output_filename)
+    return output_path, output_filename
+
+def encode_profile_id(profile):
+    """Identifies a profile's settings in output cache keys."""
+    return f"{profile}:{json.dumps(ENCODE_PROFILES[profile], sort_keys=True)}"
+
+def encode_args(profile):
+    """ffmpeg video encoder arguments for a named profile."""
+    settings = ENCODE_PROFILES[profile]
+    args = [
+        '-c:v', 'libx264',
+        '-preset', settings['preset'],
+        '-crf', str(settings['crf']),
+        '-threads', str(settings['threads']),
+    ]
+    if settings['tune']:
+        args += ['-tune', settings['tune']]
+    # yuv420p for player compatibility; faststart so playback can begin before the download ends
+    args += ['-pix_fmt', 'yuv420p', '-movflags', '+faststart']
+    return args
+
+def render_hook_video(filepath, hook_text, output_filename, input_hash=None, profile=DEFAULT_PROFILE):
+    """Burn hook_text onto the uploaded video and return the output path."""
     # Process Video
     # Get video details
-    w, h, duration = get_video_duration_and_size(filepath)
+    w, h, duration = get_video_duration_and_size(filepath, input_hash)
+
+    # Previews render at reduced size; x264 needs even dimensions
+    scale = ENCODE_PROFILES[profile]['scale']
+    w, h = int(w * scale) // 2 * 2, int(h * scale) // 2 * 2
     
     # Max duration 60s
     max_duration = min(duration, 60)
@@ -237,51 +348,241 @@ def generate_video_internal(filepath, emotion):
     # Overlay duration (Full Video)
     overlay_duration = max_duration
 
-    # Create overlay image
-    temp_overlay_path = create_text_overlay(hook_text, overlay_duration, (w, h))
+    # Create overlay image (stays in the overlay cache for the next render of this hook)
+    temp_overlay_path = create_text_overlay(hook_text, overlay_duration, (w, h), scale)
 
-    output_filename = f"hook_{target_emotion}_{os.urandom(4).hex()}.mp4"
     output_path = os.path.join(OUTPUT_FOLDER, output_filename)
+    # Encode to a temp name and rename when complete: a download or cache
+    # lookup never sees a half-written file
+    tmp_path = os.path.join(OUTPUT_FOLDER, f".{output_filename}.{os.urandom(4).hex()}.tmp.mp4")
     
     cmd = [
         'ffmpeg', '-y',
+        # Machine-readable progress on stdout instead of the stats line on stderr
+        '-progress', 'pipe:1', '-nostats',
         '-i', filepath,
         '-loop', '1', '-i', temp_overlay_path, # Loop the overlay image
         '-filter_complex', f"[0:v]scale={w}:{h}[base];[base][1:v]overlay=0:0:shortest=1",
         '-t', str(max_duration),
-        '-c:v', 'libx264',
-        '-preset', 'ultrafast',
+        *encode_args(profile),
         '-an', # Remove audio
-        output_path
+        tmp_path
     ]
     
-    print(f"Running ffmpeg: {' '.join(cmd)}")
-    subprocess.run(cmd, check=True)
-
-    # Mark as used after successful generation
-    mark_hook_as_used(selected_hook)
+    metrics.log(f"Running ffmpeg: {' '.join(cmd)}")
+    with metrics.span("encode"), metrics.ENCODES_IN_FLIGHT.track():
+        run_ffmpeg(cmd, max_duration, profile, tmp_path)
+    os.replace(tmp_path, output_path)
+
+    return output_path
+
+def run_ffmpeg(cmd, duration, stage, output_path):
+    """
+    Run an ffmpeg command that writes -progress to stdout, publishing
+    frame/fps/speed/percent on the current job after every progress block.
+    Kills ffmpeg and raises jobs.JobCancelled if the job is cancelled.
+    """
+    jobs.raise_if_cancelled()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, text=True)
+    block = {}
+    try:
+        for line in proc.stdout:
+            key, _, value = line.strip().partition('=')
+            if key != 'progress':
+                block[key] = value
+                continue
+
+            # One block ends with progress=continue (or =end on the last one)
+            jobs.update_current_job(progress=parse_progress(block, duration, stage))
+            block = {}
+            if jobs.cancel_requested():
+                proc.kill()
+                break
+        proc.wait()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        remove_file(output_path)
+        raise
+
+    if jobs.cancel_requested() or proc.returncode != 0:
+        # Don't leave a truncated mp4 behind
+        remove_file(output_path)
+        jobs.raise_if_cancelled()
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+def parse_progress(block, duration, stage):
+    """Turn one ffmpeg -progress block into the fields the UI shows."""
+    # out_time_ms is actually microseconds; newer builds also write out_time_us
+    out_us = block.get('out_time_us') or block.get('out_time_ms') or '0'
+    try:
+        out_seconds = max(int(out_us), 0) / 1_000_000
+    except ValueError:
+        out_seconds = 0.0
+    percent = min(100.0, out_seconds / duration * 100) if duration else 0.0
 
     try:
-            # Cleanup
-            os.remove(temp_overlay_path)
-    except:
-            pass
-            
-    return output_path, hook_text, output_filename
+        fps = float(block.get('fps') or 0)
+    except ValueError:
+        fps = 0.0
+
+    return {
+        "stage": stage,
+        "frame": int(block.get('frame') or 0),
+        "fps": fps,
+        "speed": block.get('speed', '').strip() or None,
+        "percent": round(percent, 1),
+    }
+
+def save_upload(file, filepath):
+    """Stream an uploaded file to disk, hashing it on the way. Returns the sha256."""
+    digest = hashlib.sha256()
+    with metrics.span("upload_save"), open(filepath, 'wb') as out:
+        while True:
+            chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            metrics.BYTES_IN.inc(len(chunk))
+    return digest.hexdigest()
+
+@app.before_request
+def begin_trace():
+    metrics.start_trace(request.headers.get('X-Request-Id'))
+
+@app.after_request
+def add_trace_header(response):
+    response.headers['X-Trace-Id'] = metrics.current_trace()
+    return response
 
 @app.route('/')
 def index():
     return send_file('index.html')
 
+def compress_body(body):
+    """Compress body with the best encoding the client accepts. Returns (body, encoding)."""
+    if len(body) < COMPRESS_MIN_BYTES or not request.headers.get('Accept-Encoding'):
+        return body, None
+    available = (['br'] if brotli else []) + ['gzip']
+    encoding = request.accept_encodings.best_match(available)
+    if encoding == 'br':
+        return brotli.compress(body, quality=5), encoding
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6), encoding
+    return body, None
+
+def json_listing_response(payload):
+    """
+    JSON response validated by ETag: a client that already has this exact
+    payload gets an empty 304 instead of the body again.
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:32]
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        body, encoding = compress_body(body)
+        response = Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+    # Weak: the same payload has the same tag whatever the encoding
+    response.set_etag(etag, weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Cache, but revalidate every time (cheap thanks to the 304)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def listing_args():
+    """(emotion, limit, cursor) from the query string; raises ValueError on bad input."""
+    try:
+        limit = int(request.args.get('limit', LIST_DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be an integer") from None
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return request.args.get('emotion') or None, min(limit, LIST_MAX_LIMIT), request.args.get('cursor') or None
+
+@app.route('/hooks')
+def list_active_hooks():
+    """?emotion=&limit=&cursor= -- the active library, in library order."""
+    try:
+        emotion, limit, cursor = listing_args()
+        sync_hooks()  # picks up a changed top_hooks.json
+        hooks, next_cursor, total = hook_store.active_page(emotion, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return json_listing_response({"hooks": hooks, "next_cursor": next_cursor, "total": total})
+
+@app.route('/hooks/used')
+def list_used_hooks():
+    """?emotion=&limit=&cursor= -- the used history, newest first."""
+    try:
+        emotion, limit, cursor = listing_args()
+        hooks, next_cursor, total = hook_store.used_page(emotion, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return json_listing_response({"hooks": hooks, "next_cursor": next_cursor, "total": total})
+
 @app.route('/top_hooks.json')
 def get_hooks_json():
-    return send_file('top_hooks.json')
+    return json_listing_response(load_hooks())
 
 @app.route('/used_hooks.json')
 def get_used_hooks_json():
-    if not os.path.exists(USED_HOOKS_FILE):
-        return jsonify([])
-    return send_file(USED_HOOKS_FILE)
+    return json_listing_response(load_used_hooks())
+
+@app.route('/hooks/search')
+def search_hooks():
+    """?q=<words>&emotion=&status=active,used,scraped&limit=&offset="""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Missing q"}), 400
+
+    statuses = [s for s in request.args.get('status', '').split(',') if s]
+    unknown = [s for s in statuses if s not in SEARCH_STATUSES]
+    if unknown:
+        return jsonify({"error": f"Unknown status '{unknown[0]}'"}), 400
+
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), SEARCH_MAX_LIMIT))
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    results, total = hook_store.search(
+        query, emotion=request.args.get('emotion') or None, statuses=statuses, limit=limit, offset=offset
+    )
+    next_offset = offset + len(results)
+    return jsonify({
+        "query": query,
+        "results": results,
+        "total": total,
+        "next_offset": next_offset if next_offset < total else None,
+    })
+
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+def render_upload_job(filepath, emotion, input_hash, profile, with_preview):
+    """Job body for /upload-video: render, drop the upload, return the result."""
+    try:
+        output_path, hook_text, filename = generate_video_internal(
+            filepath, emotion, input_hash, profile, with_preview
+        )
+    finally:
+        # Cleanup input
+        remove_file(filepath)
+
+    return {
+        "video_url": f"/download/{filename}",
+        "filename": filename,
+        "hook_text": hook_text,
+        "emotion": emotion.capitalize()
+    }
 
 @app.route('/upload-video', methods=['POST'])
 def upload_video():
@@ -290,42 +591,164 @@ def upload_video():
     
     file = request.files['video']
     emotion = request.form.get('emotion', 'General')
+    profile = request.form.get('profile', DEFAULT_PROFILE)
+    # Two-tier mode: publish a quick low-res preview, then swap in the final render
+    with_preview = request.form.get('preview') in ('1', 'true', 'on')
     
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
+    if profile not in ENCODE_PROFILES:
+        return jsonify({"error": f"Unknown profile '{profile}'"}), 400
+
     _, ext = os.path.splitext(file.filename)
     if not ext: ext = '.mp4'
         
     filename = f"upload_{os.urandom(4).hex()}{ext}"
     filepath = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(filepath)
+    input_hash = save_upload(file, filepath)
     
+    job_id = jobs.submit_job(render_upload_job, filepath, emotion, input_hash, profile, with_preview,
+                             cleanup=lambda: remove_file(filepath))
+
+    return jsonify({
+        "status": jobs.QUEUED,
+        "job_id": job_id,
+        "trace_id": metrics.current_trace(),
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+        "events_url": f"/jobs/{job_id}/events",
+        "cancel_url": f"/jobs/{job_id}/cancel"
+    }), 202
+
+def job_payload(job):
+    payload = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+    # Intermediate results such as preview_url while the final render runs
+    payload.update(job["partial"])
+    if job["status"] == jobs.DONE:
+        payload.update(job["result"])
+    elif job["status"] == jobs.FAILED:
+        payload["error"] = job["error"]
+    return payload
+
+def event_stream(job_ids, payload):
+    """
+    Server-Sent Events for a set of jobs: payload(snapshots) is sent each time
+    one of them changes, until all of them have finished.
+    """
+    seen = {}
+    while True:
+        snapshots = jobs.wait_for_update(job_ids, seen, SSE_KEEPALIVE)
+        current = {job_id: job["version"] for job_id, job in snapshots.items()}
+        if current == seen:
+            # Comment line keeps proxies from closing an idle connection
+            yield ": keepalive\n\n"
+            continue
+        seen = current
+        yield f"data: {json.dumps(payload(snapshots))}\n\n"
+        if snapshots and all(job["status"] in jobs.FINISHED for job in snapshots.values()):
+            return
+
+def sse_response(stream):
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job_payload(job))
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    if job["status"] == jobs.DONE:
+        return jsonify({"status": "success", **job["result"]})
+    if job["status"] == jobs.FAILED:
+        return jsonify({"error": job["error"]}), 500
+    if job["status"] == jobs.CANCELLED:
+        return jsonify({"error": "Job was cancelled"}), 409
+    # Still queued or running
+    return jsonify(job_payload(job)), 202
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    if jobs.get_job(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return sse_response(event_stream([job_id], lambda snapshots: job_payload(snapshots[job_id])))
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if jobs.get_job(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify({"job_id": job_id, "cancelled": jobs.cancel_job(job_id)})
+
+def batch_job_ids(batch_id):
+    return [f"{batch_id}-{i}" for i in range(1, 4)]
+
+def batch_payload(snapshots):
+    return {"items": {job["id"].rsplit('-', 1)[1]: job_payload(job) for job in snapshots.values()}}
+
+@app.route('/batches/<batch_id>/events')
+def batch_events(batch_id):
+    # The client opens this before its /batch-upload request registers the items
+    return sse_response(event_stream(batch_job_ids(batch_id), batch_payload))
+
+@app.route('/batches/<batch_id>/cancel', methods=['POST'])
+def cancel_batch(batch_id):
+    cancelled = [job_id for job_id in batch_job_ids(batch_id) if jobs.cancel_job(job_id)]
+    return jsonify({"batch_id": batch_id, "cancelled": len(cancelled)})
+
+def render_batch_item(i, job_id, filepath, emotion, input_hash, profile):
+    """Render one batch item as job_id. Failures are logged and reported as None."""
     try:
-        output_path, hook_text, filename = generate_video_internal(filepath, emotion)
-        
-        # Cleanup input
+        job = jobs.run_job(job_id, render_upload_job, filepath, emotion, input_hash, profile, False)
+        if job["status"] != jobs.DONE:
+            metrics.log(f"Error processing batch item {i}: {job['error'] or job['status']}")
+            return None
+        out_name = job["result"]["filename"]
+        return out_name, os.path.join(OUTPUT_FOLDER, out_name)
+    finally:
         if os.path.exists(filepath):
             os.remove(filepath)
-        
-        return jsonify({
-            "status": "success",
-            "video_url": f"/download/{filename}",
-            "hook_text": hook_text,
-            "emotion": emotion.capitalize()
-        })
-        
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+
+def batch_concurrency():
+    """Per-batch worker count from the request, clamped to BATCH_CONCURRENCY."""
+    try:
+        requested = int(request.form.get('concurrency', BATCH_CONCURRENCY))
+    except ValueError:
+        requested = BATCH_CONCURRENCY
+    return max(1, min(requested, BATCH_CONCURRENCY))
 
 @app.route('/batch-upload', methods=['POST'])
 def batch_upload():
     # Expect video1, video2, video3 and emotion1, emotion2, emotion3
-    generated_files = []
+    generated_files = iter(())
     
+    profile = request.form.get('profile', DEFAULT_PROFILE)
+    if profile not in ENCODE_PROFILES:
+        return jsonify({"error": f"Unknown profile '{profile}'"}), 400
+
+    # Client-chosen so it can subscribe to /batches/<id>/events before this returns
+    batch_id = request.form.get('batch_id') or os.urandom(8).hex()
+    if not BATCH_ID_RE.match(batch_id):
+        return jsonify({"error": "Invalid batch_id"}), 400
+
     try:
+        # Save every upload first; the files are only readable inside the request
+        items = []
         for i in range(1, 4):
             key_file = f"video{i}"
             key_emotion = f"emotion{i}"
@@ -337,36 +760,45 @@ def batch_upload():
                 _, ext = os.path.splitext(file.filename)
                 if not ext: ext = '.mp4'
                 
+                try:
+                    job_id = jobs.create_job(f"{batch_id}-{i}")
+                except ValueError:
+                    # batch_id belongs to an earlier batch; undo this one's items
+                    for _, created_id, saved_path, *_ in items:
+                        jobs.cancel_job(created_id)
+                        if os.path.exists(saved_path):
+                            os.remove(saved_path)
+                    return jsonify({"error": f"Batch {batch_id} already exists"}), 409
+
                 filename = f"batch_{i}_{os.urandom(4).hex()}{ext}"
                 filepath = os.path.join(UPLOAD_FOLDER, filename)
-                file.save(filepath)
-                
-                try:
-                    output_path, _, out_name = generate_video_internal(filepath, emotion)
-                    generated_files.append((out_name, output_path))
-                    
-                    if os.path.exists(filepath):
-                        os.remove(filepath)
-                except Exception as e:
-                    print(f"Error processing batch item {i}: {e}")
-                    # Continue to next item even if one fails
-        
-        if not generated_files:
+                input_hash = save_upload(file, filepath)
+                items.append((i, job_id, filepath, emotion, input_hash, profile))
+
+        # Render concurrently; one failing item doesn't stop the others
+        if items:
+            pool = ThreadPoolExecutor(max_workers=min(batch_concurrency(), len(items)))
+            # Each worker gets a copy of the request context so logs keep the trace id
+            futures = [pool.submit(contextvars.copy_context().run, render_batch_item, *item) for item in items]
+            pool.shutdown(wait=False)
+            completed = (f.result() for f in as_completed(futures))
+            generated_files = (r for r in completed if r)
+
+        # Hold the response until one item succeeds so a fully failed batch
+        # can still answer with a JSON error
+        first = next(generated_files, None)
+        if first is None:
             return jsonify({"error": "No videos processed successfully"}), 500
-            
-        # Create ZIP
-        memory_file = io.BytesIO()
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for name, path in generated_files:
-                zf.write(path, name)
-                
-        memory_file.seek(0)
-        
-        return send_file(
-            memory_file,
+
+        def zip_entries():
+            yield first
+            # Remaining items are added to the archive as they finish
+            yield from generated_files
+
+        return Response(
+            metrics.timed_stream(zip_stream.iter_zip(zip_entries()), "zip", "zip"),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name='notewall_batch.zip'
+            headers={'Content-Disposition': 'attachment; filename=notewall_batch.zip'}
         )
 
     except Exception as e:
@@ -374,9 +806,40 @@ def batch_upload():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify({
+        "output": output_cache.stats(),
+        "overlay": overlay_cache.stats(),
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/download/<filename>')
 def download_file(filename):
-    return send_from_directory(OUTPUT_FOLDER, filename)
+    # Only finished renders: in-progress encodes and anything else kept in
+    # the folder are dotfiles or not .mp4
+    if filename.startswith('.') or not filename.endswith('.mp4'):
+        return jsonify({"error": "File not found"}), 404
+    path = safe_join(OUTPUT_FOLDER, filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({"error": "File not found"}), 404
+
+    if DOWNLOAD_OFFLOAD == 'x-accel':
+        # nginx serves the file, Range requests included; Python never touches the bytes
+        response = Response(mimetype='video/mp4')
+        response.headers['X-Accel-Redirect'] = X_ACCEL_PREFIX + quote(filename)
+        return response
+
+    # conditional=True answers Range with 206 partial content (and If-None-Match
+    # with 304), so previews start and seek without downloading the whole file.
+    # Werkzeug copies 206 bodies through Python; DOWNLOAD_OFFLOAD avoids that.
+    response = send_file(os.path.abspath(path), conditional=True, max_age=DOWNLOAD_MAX_AGE)
+    if response.content_length:
+        metrics.BYTES_OUT.inc(response.content_length, "download")
+    return response
 
 if __name__ == '__main__':
     print("Starting Flask server on port 8000...")
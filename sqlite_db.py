@@ -0,0 +1,47 @@
+"""
+Per-thread SQLite connections for the stores and caches.
+
+sqlite3 connections can't be shared between threads, so each thread opens
+its own on first use. Connections run in autocommit mode; statements that
+must apply together go through _transaction(), which takes the write lock
+up front (BEGIN IMMEDIATE) so concurrent writers queue instead of failing
+half way.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SQLiteDB:
+    """Base for classes backed by one SQLite file."""
+
+    # Set to sqlite3.Row for rows addressable by column name
+    row_factory = None
+
+    def __init__(self, db_path, wal=False):
+        self.db_path = db_path
+        self._local = threading.local()
+        if wal:
+            # Readers don't block the writer (and vice versa)
+            self._conn().execute("PRAGMA journal_mode=WAL")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
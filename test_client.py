@@ -1,6 +1,6 @@
-
 import requests
 import os
+import time
 
 url = 'http://localhost:8000/upload-video'
 video_path = 'IMG_5720.MOV'
@@ -9,8 +9,18 @@ data = {'emotion': 'General'}
 
 print(f"Sending request to {url}...")
 try:
-    response = requests.post(url, files=files, data=data, timeout=120)
+    response = requests.post(url, files=files, data=data, timeout=30)
     print(f"Status Code: {response.status_code}")
     print(f"Response: {response.text}")
+
+    # Upload returns a job id straight away; poll until the render finishes
+    status_url = 'http://localhost:8000' + response.json()['status_url']
+    while True:
+        job = requests.get(status_url, timeout=10).json()
+        print(f"Job status: {job['status']}")
+        if job['status'] in ('done', 'failed', 'cancelled'):
+            print(f"Result: {job}")
+            break
+        time.sleep(2)
 except Exception as e:
     print(f"Error: {e}")
@@ -16,16 +16,26 @@ Usage:
   2. Add app demo clips to app_demos/
   3. Set your GEMINI_API_KEY below (or as env var)
   4. Run: python video_generator.py
+     (add --backend ffmpeg to render with a single ffmpeg filter graph,
+      which is much faster and lighter on RAM than moviepy, and
+      --workers 3 to render all videos in parallel)
 
 Dependencies:
   pip install moviepy pillow google-genai
+  ffmpeg/ffprobe on PATH for the ffmpeg backend
 """
 
 import os
 import sys
 import json
+import hashlib
+import inspect
 import random
+import argparse
+import subprocess
 import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -45,11 +55,15 @@ except ImportError:
         sys.exit(1)
 
 try:
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import Image, ImageDraw
 except ImportError:
     print("❌ Pillow not installed. Run: pip install pillow")
     sys.exit(1)
 
+import fonts
+import hook_store
+from media_probe import hash_file
+
 try:
     from google import genai
 except ImportError:
@@ -92,6 +106,27 @@ HOOK_TEXT_COLOR = (255, 255, 255)
 CTA_TEXT_COLOR = (255, 255, 255)
 ACCENT_COLOR = (167, 139, 250)  # Purple accent
 
+# CTA card variants (title, subtitle)
+CTA_TEXTS = [
+    ("NoteWall 👆", "Lock Screen Notes — App Store & Google Play"),
+    ("Search NoteWall", "Your lock screen, your to-do list ✨"),
+    ("NoteWall", "Notes on your wallpaper — link in bio"),
+]
+
+# Render backend: "moviepy" (frame-by-frame in Python) or "ffmpeg"
+# (one filter_complex graph in an ffmpeg subprocess). Override with --backend.
+RENDER_BACKEND = os.environ.get("RENDER_BACKEND", "moviepy")
+
+# ffmpeg backend: encode static hook/CTA/placeholder cards once into
+# segment_cache/ and join them to the footage by stream copy
+SEGMENT_FOLDER = SCRIPT_DIR / "segment_cache"
+USE_SEGMENT_CACHE = True
+# Hook cards are mostly single-use, so segments are evicted least recently
+# used first past this budget; ones used within the grace period are kept
+# because a parallel render may still be concatenating them
+SEGMENT_CACHE_LIMIT_BYTES = 1024 * 1024 * 1024
+SEGMENT_CACHE_GRACE = 10 * 60
+
 # Reaction types to process
 REACTIONS = ["scared", "joyful", "shocked"]
 
@@ -114,9 +149,8 @@ _genai_client = None
 HOOKS_DB = []
 
 def load_hooks_db():
-    """Load hooks from top_hooks.json if available, otherwise use defaults."""
+    """Load the active hooks from the hook store if available, otherwise use defaults."""
     global HOOKS_DB
-    json_path = SCRIPT_DIR / "top_hooks.json"
     
     defaults = [
         {"text": "POV: you stop forgetting everything because it's on your lock screen", "emotion": "Joyful"},
@@ -129,23 +163,18 @@ def load_hooks_db():
         {"text": "stop ignoring your reminders. make them IMPOSSIBLE to ignore.", "emotion": "Fear"}
     ]
     
-    if json_path.exists():
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                loaded_hooks = json.load(f)
-                if isinstance(loaded_hooks, list) and len(loaded_hooks) > 0:
-                    # Normalize to object format if it's a list of strings (backward compatibility)
-                    normalized = []
-                    for h in loaded_hooks:
-                        if isinstance(h, str):
-                            normalized.append({"text": h, "emotion": "General"})
-                        elif isinstance(h, dict):
-                            normalized.append(h)
-                    HOOKS_DB = normalized
-                    print(f"📚 Loaded {len(HOOKS_DB)} hooks from top_hooks.json")
-                    return
-        except Exception as e:
-            print(f"⚠️  Error loading top_hooks.json: {e}")
+    # The server consumes hooks in hooks.db, not in top_hooks.json, so read
+    # the store (which imports the JSON files when they change) to skip them
+    try:
+        store = hook_store.HookStore(str(SCRIPT_DIR / hook_store.DB_FILE))
+        store.sync_from_json(str(SCRIPT_DIR / hook_store.HOOKS_FILE), str(SCRIPT_DIR / hook_store.USED_HOOKS_FILE))
+        loaded_hooks = store.active_hooks()
+        if loaded_hooks:
+            HOOKS_DB = loaded_hooks
+            print(f"📚 Loaded {len(HOOKS_DB)} hooks from {hook_store.DB_FILE}")
+            return
+    except Exception as e:
+        print(f"⚠️  Error loading hooks: {e}")
     
     HOOKS_DB = defaults
     print(f"📚 using {len(HOOKS_DB)} default hooks")
@@ -244,40 +273,14 @@ def get_hooks_for_reactions(reactions):
 # TEXT OVERLAY CREATION
 # ═══════════════════════════════════════════════════════
 
-def find_font():
-    """Find a suitable bold font on the system."""
-    font_paths = [
-        # macOS
-        "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
-        "/System/Library/Fonts/SFNSDisplayCondensed-Bold.otf",
-        "/System/Library/Fonts/Helvetica.ttc",
-        "/Library/Fonts/Arial Bold.ttf",
-        # Linux
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-        # Windows
-        "C:/Windows/Fonts/arialbd.ttf",
-        "C:/Windows/Fonts/segoeui.ttf",
-    ]
-    for fp in font_paths:
-        if os.path.exists(fp):
-            return fp
-    return None
-
-
-def create_text_overlay(text, duration, bg_color=BG_COLOR, text_color=HOOK_TEXT_COLOR,
-                        font_size=80, subtitle=None):
-    """Create a text overlay video clip with centered bold text."""
+def render_card_image(text, path, bg_color=BG_COLOR, text_color=HOOK_TEXT_COLOR,
+                      font_size=80, subtitle=None):
+    """Draw a full-frame card with centered bold text and save it to path."""
     img = Image.new('RGB', (VIDEO_WIDTH, VIDEO_HEIGHT), color=bg_color)
     draw = ImageDraw.Draw(img)
 
-    font_path = find_font()
-    try:
-        font = ImageFont.truetype(font_path, font_size) if font_path else ImageFont.load_default()
-        small_font = ImageFont.truetype(font_path, int(font_size * 0.5)) if font_path else ImageFont.load_default()
-    except Exception:
-        font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
+    font = fonts.load_font(font_size)
+    small_font = fonts.load_font(int(font_size * 0.5))
 
     # Word wrap the text
     max_chars = max(12, int(VIDEO_WIDTH / (font_size * 0.55)))
@@ -308,14 +311,102 @@ def create_text_overlay(text, duration, bg_color=BG_COLOR, text_color=HOOK_TEXT_
         sub_y = y + text_height + 40
         draw.text((sub_x, sub_y), subtitle, fill=(*ACCENT_COLOR, 200), font=small_font)
 
-    # Save temp image and create clip
-    temp_path = str(OUTPUT_FOLDER / '_temp_overlay.png')
-    img.save(temp_path)
-    clip = ImageClip(temp_path).set_duration(duration).resize((VIDEO_WIDTH, VIDEO_HEIGHT))
+    img.save(path)
+    return path
+
+
+def create_text_overlay(text, duration, bg_color=BG_COLOR, text_color=HOOK_TEXT_COLOR,
+                        font_size=80, subtitle=None):
+    """Create a text overlay video clip with centered bold text."""
+    # Save temp image and create clip. The name is unique per call so parallel
+    # workers never overwrite each other's overlay.
+    temp_path = OUTPUT_FOLDER / f'_temp_overlay_{os.getpid()}_{os.urandom(4).hex()}.png'
+    render_card_image(text, str(temp_path), bg_color=bg_color, text_color=text_color,
+                      font_size=font_size, subtitle=subtitle)
+    try:
+        # ImageClip reads the pixels up front, so the file can go right away
+        clip = ImageClip(str(temp_path)).set_duration(duration).resize((VIDEO_WIDTH, VIDEO_HEIGHT))
+    finally:
+        temp_path.unlink(missing_ok=True)
 
     return clip
 
 
+# ═══════════════════════════════════════════════════════
+# DEMO MEZZANINE CACHE
+# ═══════════════════════════════════════════════════════
+
+# Demo clips are transcoded once into 1080x1920 / FPS intermediates with a
+# keyframe every half second, so renders can use them without any per-frame
+# scaling or cropping. Each source clip gets its own subdirectory.
+MEZZANINE_FOLDER = DEMO_FOLDER / ".mezzanine"
+MEZZANINE_ARGS = [
+    '-c:v', 'libx264', '-preset', 'fast', '-crf', '16',
+    '-g', str(FPS // 2), '-keyint_min', str(FPS // 2), '-sc_threshold', '0',
+    '-pix_fmt', 'yuv420p',
+    '-c:a', 'aac', '-b:a', '192k', '-ar', '44100', '-ac', '2',
+]
+
+
+def mezzanine_for(demo_path):
+    """
+    Path of the pre-normalized copy of demo_path, transcoding it if it is
+    missing or stale. Falls back to the original clip if transcoding fails.
+    """
+    settings = [VIDEO_WIDTH, VIDEO_HEIGHT, FPS, MAX_DEMO_DURATION, MEZZANINE_ARGS]
+    settings_key = hashlib.sha256(json.dumps([demo_path.name, settings]).encode()).hexdigest()[:12]
+    source_dir = MEZZANINE_FOLDER / demo_path.name
+    mezz_path = source_dir / f"{settings_key}.mp4"
+    meta_path = mezz_path.with_suffix('.json')
+
+    st = demo_path.stat()
+    meta = {}
+    if mezz_path.exists() and meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text())
+        except ValueError:
+            meta = {}
+
+    if meta.get("mtime_ns") == st.st_mtime_ns and meta.get("size") == st.st_size:
+        return mezz_path
+
+    # mtime changed but the contents may not have (copied or touched file)
+    source_hash = hash_file(demo_path)
+    if meta.get("sha256") == source_hash:
+        meta.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+        meta_path.write_text(json.dumps(meta))
+        return mezz_path
+
+    print(f"   ⏳ Normalizing demo clip {demo_path.name} (one-time)...")
+    source_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = mezz_path.with_name(f"{mezz_path.stem}.{os.getpid()}.tmp.mp4")
+    cmd = [
+        'ffmpeg', '-y', '-v', 'error',
+        '-t', str(MAX_DEMO_DURATION), '-i', str(demo_path),
+        '-vf', (f"scale={VIDEO_WIDTH}:{VIDEO_HEIGHT}:force_original_aspect_ratio=increase,"
+                f"crop={VIDEO_WIDTH}:{VIDEO_HEIGHT},setsar=1,fps={FPS}"),
+        *MEZZANINE_ARGS,
+        str(tmp_path)
+    ]
+    try:
+        subprocess.run(cmd, check=True)
+    except Exception as e:
+        print(f"   ⚠️  Could not normalize {demo_path.name}: {e}. Using the original clip.")
+        tmp_path.unlink(missing_ok=True)
+        return demo_path
+
+    # Rename into place so parallel workers never read a partial file
+    os.replace(tmp_path, mezz_path)
+    meta_path.write_text(json.dumps({"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": source_hash}))
+
+    # Drop this clip's intermediates made with older settings
+    for old in source_dir.iterdir():
+        if old.name.split('.')[0] != settings_key:
+            old.unlink(missing_ok=True)
+
+    return mezz_path
+
+
 # ═══════════════════════════════════════════════════════
 # VIDEO PROCESSING
 # ═══════════════════════════════════════════════════════
@@ -349,33 +440,62 @@ def process_ugc_clip(filepath):
     return clip
 
 
-def get_random_demo():
-    """Get a random app demo clip."""
+def find_ugc_clip(reaction_type):
+    """Path of today's UGC clip for reaction_type, or None if it wasn't recorded."""
+    ugc_path = UGC_FOLDER / f"ugc_{reaction_type}.mp4"
+    if not ugc_path.exists():
+        # Try without extension-specific check
+        for ext in ['.mp4', '.mov', '.MOV', '.MP4']:
+            alt_path = UGC_FOLDER / f"ugc_{reaction_type}{ext}"
+            if alt_path.exists():
+                ugc_path = alt_path
+                break
+    return ugc_path if ugc_path.exists() else None
+
+
+def pick_demo_path():
+    """Path of a random app demo clip, or None if there are none."""
+    if not DEMO_FOLDER.exists():
+        return None
     demo_files = [
         f for f in DEMO_FOLDER.iterdir()
         if f.suffix.lower() in ('.mp4', '.mov', '.avi', '.mkv', '.webm')
     ]
     if not demo_files:
         return None
-    demo_path = random.choice(demo_files)
-    clip = VideoFileClip(str(demo_path))
+    return random.choice(demo_files)
+
+
+def get_random_demo():
+    """Get a random app demo clip."""
+    demo_path = pick_demo_path()
+    if demo_path is None:
+        return None
+    clip = VideoFileClip(str(mezzanine_for(demo_path)))
 
     # Trim to max duration
     if clip.duration > MAX_DEMO_DURATION:
         clip = clip.subclip(0, MAX_DEMO_DURATION)
 
-    clip = resize_clip(clip)
+    # Already frame-sized when the mezzanine was used
+    if (clip.w, clip.h) != (VIDEO_WIDTH, VIDEO_HEIGHT):
+        clip = resize_clip(clip)
     return clip
 
 
-def create_video(reaction_type, hook_text, video_num):
+def create_video(reaction_type, hook_text, video_num, backend=None, segment_cache=USE_SEGMENT_CACHE):
     """Create a single combined video."""
+    backend = backend or RENDER_BACKEND
+    if backend == "ffmpeg":
+        return create_video_ffmpeg(reaction_type, hook_text, video_num, segment_cache)
+
     print(f"\n{'='*50}")
     print(f"📹 Creating Video {video_num} ({reaction_type} reaction)")
     print(f"   Hook: \"{hook_text}\"")
     print(f"{'='*50}")
 
     clips_to_close = []
+    tmp_path = None
 
     try:
         # 1. Create hook overlay (0 - 2.5s)
@@ -388,17 +508,9 @@ def create_video(reaction_type, hook_text, video_num):
         clips_to_close.append(hook_clip)
 
         # 2. Load UGC reaction video
-        ugc_path = UGC_FOLDER / f"ugc_{reaction_type}.mp4"
-        if not ugc_path.exists():
-            # Try without extension-specific check
-            for ext in ['.mp4', '.mov', '.MOV', '.MP4']:
-                alt_path = UGC_FOLDER / f"ugc_{reaction_type}{ext}"
-                if alt_path.exists():
-                    ugc_path = alt_path
-                    break
-
-        if not ugc_path.exists():
-            print(f"   ⚠️  UGC file not found: {ugc_path}")
+        ugc_path = find_ugc_clip(reaction_type)
+        if ugc_path is None:
+            print(f"   ⚠️  UGC file not found: {UGC_FOLDER / f'ugc_{reaction_type}.mp4'}")
             print(f"       Creating placeholder clip instead.")
             ugc_clip = create_text_overlay(
                 f"[{reaction_type.upper()} REACTION]",
@@ -429,12 +541,7 @@ def create_video(reaction_type, hook_text, video_num):
 
         # 4. Create CTA overlay (15 - 17s)
         print("   ⏳ Creating CTA overlay...")
-        cta_texts = [
-            ("NoteWall 👆", "Lock Screen Notes — App Store & Google Play"),
-            ("Search NoteWall", "Your lock screen, your to-do list ✨"),
-            ("NoteWall", "Notes on your wallpaper — link in bio"),
-        ]
-        cta_text, cta_sub = random.choice(cta_texts)
+        cta_text, cta_sub = random.choice(CTA_TEXTS)
         cta_clip = create_text_overlay(
             cta_text,
             duration=CTA_DURATION,
@@ -456,15 +563,20 @@ def create_video(reaction_type, hook_text, video_num):
         output_path = OUTPUT_FOLDER / f"video_{video_num}_{reaction_type}.mp4"
         print(f"   ⏳ Exporting to: {output_path}")
 
+        # Written under a temp name and renamed, so a half-written file never
+        # replaces a good one; faststart puts the moov atom up front for streaming
+        tmp_path = OUTPUT_FOLDER / f".{output_path.stem}.{os.urandom(4).hex()}.tmp.mp4"
         final.write_videofile(
-            str(output_path),
+            str(tmp_path),
             fps=FPS,
             codec='libx264',
             audio_codec='aac',
             preset='medium',
             bitrate='5000k',
+            ffmpeg_params=['-movflags', '+faststart'],
             logger='bar'
         )
+        os.replace(tmp_path, output_path)
 
         print(f"   ✅ Video {video_num} saved: {output_path}")
         return str(output_path)
@@ -482,17 +594,337 @@ def create_video(reaction_type, hook_text, video_num):
                 clip.close()
             except:
                 pass
-        # Clean up temp files
-        temp_path = OUTPUT_FOLDER / '_temp_overlay.png'
-        if temp_path.exists():
-            temp_path.unlink()
+        # Only still there if the export didn't finish
+        if tmp_path:
+            tmp_path.unlink(missing_ok=True)
+
+
+# ═══════════════════════════════════════════════════════
+# FFMPEG RENDER BACKEND
+# ═══════════════════════════════════════════════════════
+
+# Mirrors the moviepy export settings in create_video. Cached card segments
+# use the same settings so they can be joined to fresh encodes by stream copy.
+VIDEO_ENCODE_ARGS = [
+    '-c:v', 'libx264', '-preset', 'medium', '-b:v', '5000k', '-profile:v', 'high',
+    '-r', str(FPS), '-pix_fmt', 'yuv420p',
+    '-c:a', 'aac', '-b:a', '128k', '-ar', '44100', '-ac', '2',
+]
+FFMPEG_ENCODE_ARGS = VIDEO_ENCODE_ARGS + ['-movflags', '+faststart']
+# MPEG-TS carries SPS/PPS in-band, so independently encoded segments concat cleanly
+SEGMENT_ENCODE_ARGS = VIDEO_ENCODE_ARGS + ['-f', 'mpegts']
+
+
+def probe_media(path):
+    """Duration and whether the file has an audio stream, in one ffprobe call."""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=duration:stream=codec_type',
+        '-of', 'json', str(path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    data = json.loads(result.stdout)
+    duration = float(data['format']['duration'])
+    has_audio = any(st.get('codec_type') == 'audio' for st in data.get('streams', []))
+    return duration, has_audio
+
+
+def card_segment(text, path, duration, **style):
+    """Timeline entry for a static text card. The image is drawn on demand."""
+    return {"kind": "image", "path": str(path), "duration": duration, "has_audio": False,
+            "text": text, "style": style}
+
+
+def ensure_card_image(seg):
+    """Draw a card segment's image if it isn't on disk yet."""
+    if not os.path.exists(seg['path']):
+        render_card_image(seg['text'], seg['path'], **seg['style'])
+    return seg['path']
+
+
+def clip_segment(path, max_duration=None, normalized=False):
+    """
+    Timeline entry for a video clip, optionally trimmed. normalized clips
+    are already VIDEO_WIDTH x VIDEO_HEIGHT at FPS and skip scaling.
+    """
+    duration, has_audio = probe_media(path)
+    if max_duration is not None:
+        duration = min(duration, max_duration)
+    return {"kind": "video", "path": str(path), "duration": duration, "has_audio": has_audio,
+            "normalized": normalized}
+
+
+def build_timeline(reaction_type, hook_text, work_prefix):
+    """The hook / UGC / demo / CTA segments of one video, same as the moviepy path."""
+    segments = []
+
+    # 1. Hook card
+    print("   ⏳ Creating hook overlay...")
+    segments.append(card_segment(hook_text, f"{work_prefix}_hook.png", HOOK_DURATION, font_size=80))
+
+    # 2. UGC reaction
+    ugc_path = find_ugc_clip(reaction_type)
+    if ugc_path is None:
+        print(f"   ⚠️  UGC file not found: {UGC_FOLDER / f'ugc_{reaction_type}.mp4'}")
+        print("       Creating placeholder clip instead.")
+        segments.append(card_segment(
+            f"[{reaction_type.upper()} REACTION]", f"{work_prefix}_ugc.png", 3,
+            bg_color=(30, 20, 40), font_size=60, subtitle="Replace with your recorded reaction"
+        ))
+    else:
+        print(f"   ⏳ Loading UGC clip: {ugc_path.name}")
+        segments.append(clip_segment(ugc_path))
+
+    # 3. App demo
+    print("   ⏳ Loading app demo clip...")
+    demo_path = pick_demo_path()
+    if demo_path is None:
+        print("   ⚠️  No app demos found in app_demos/")
+        print("       Creating placeholder clip.")
+        segments.append(card_segment(
+            "NoteWall App Demo", f"{work_prefix}_demo.png", MAX_DEMO_DURATION,
+            bg_color=(20, 15, 35), font_size=60, subtitle="Add your app demo clips to app_demos/"
+        ))
+    else:
+        mezz_path = mezzanine_for(demo_path)
+        segments.append(clip_segment(mezz_path, MAX_DEMO_DURATION, normalized=mezz_path != demo_path))
+
+    # 4. CTA card
+    print("   ⏳ Creating CTA overlay...")
+    cta_text, cta_sub = random.choice(CTA_TEXTS)
+    segments.append(card_segment(cta_text, f"{work_prefix}_cta.png", CTA_DURATION,
+                                 font_size=90, subtitle=cta_sub))
+    return segments
+
+
+def build_ffmpeg_command(segments, output_path, encode_args=FFMPEG_ENCODE_ARGS):
+    """One ffmpeg invocation that scales, crops and concatenates every segment."""
+    inputs = []
+    filters = []
+    concat_inputs = ""
+
+    for i, seg in enumerate(segments):
+        duration = f"{seg['duration']:.3f}"
+        if seg['kind'] == 'image':
+            inputs += ['-loop', '1', '-framerate', str(FPS), '-t', duration, '-i', ensure_card_image(seg)]
+        else:
+            inputs += ['-t', duration, '-i', seg['path']]
+
+        if seg.get('normalized'):
+            filters.append(f"[{i}:v]setsar=1,format=yuv420p[v{i}]")
+        else:
+            # Same crop-to-fill as resize_clip
+            filters.append(
+                f"[{i}:v]scale={VIDEO_WIDTH}:{VIDEO_HEIGHT}:force_original_aspect_ratio=increase,"
+                f"crop={VIDEO_WIDTH}:{VIDEO_HEIGHT},setsar=1,fps={FPS},format=yuv420p[v{i}]"
+            )
+        # concat needs an audio track per segment; cards and silent clips get silence
+        if seg['has_audio']:
+            filters.append(
+                f"[{i}:a]aformat=sample_rates=44100:channel_layouts=stereo,"
+                f"apad,atrim=duration={duration}[a{i}]"
+            )
+        else:
+            filters.append(f"anullsrc=r=44100:cl=stereo,atrim=duration={duration}[a{i}]")
+        concat_inputs += f"[v{i}][a{i}]"
+
+    filters.append(f"{concat_inputs}concat=n={len(segments)}:v=1:a=1[outv][outa]")
+
+    return [
+        'ffmpeg', '-y', '-v', 'error', '-stats',
+        *inputs,
+        '-filter_complex', ';'.join(filters),
+        '-map', '[outv]', '-map', '[outa]',
+        *encode_args,
+        str(output_path)
+    ]
+
+
+# ═══════════════════════════════════════════════════════
+# CARD SEGMENT CACHE
+# ═══════════════════════════════════════════════════════
+
+def cached_card_segment(seg):
+    """Path of the pre-encoded MPEG-TS segment for a card, encoding it on first use."""
+    # Everything the card is drawn with, not only the overrides passed in
+    style = {name: param.default for name, param in inspect.signature(render_card_image).parameters.items()
+             if param.default is not inspect.Parameter.empty}
+    style.update(seg['style'], accent_color=ACCENT_COLOR)
+    key_source = json.dumps([
+        seg['text'], seg['duration'], style, fonts.find_font(),
+        VIDEO_WIDTH, VIDEO_HEIGHT, FPS, SEGMENT_ENCODE_ARGS
+    ], sort_keys=True, default=str, ensure_ascii=False)
+    key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+    segment_path = SEGMENT_FOLDER / f"card_{key[:24]}.ts"
+    if segment_path.exists():
+        try:
+            # mtime doubles as last use for eviction
+            os.utime(segment_path)
+            return segment_path
+        except FileNotFoundError:
+            pass  # evicted by another worker in the meantime
+
+    SEGMENT_FOLDER.mkdir(parents=True, exist_ok=True)
+    tmp_path = segment_path.with_name(f"{segment_path.stem}.{os.getpid()}.tmp.ts")
+    duration = f"{seg['duration']:.3f}"
+    cmd = [
+        'ffmpeg', '-y', '-v', 'error',
+        '-loop', '1', '-framerate', str(FPS), '-t', duration, '-i', ensure_card_image(seg),
+        '-f', 'lavfi', '-t', duration, '-i', 'anullsrc=r=44100:cl=stereo',
+        '-map', '0:v', '-map', '1:a',
+        '-vf', 'setsar=1,format=yuv420p',
+        *SEGMENT_ENCODE_ARGS,
+        str(tmp_path)
+    ]
+    subprocess.run(cmd, check=True)
+    os.replace(tmp_path, segment_path)
+    evict_card_segments()
+    return segment_path
+
+
+def evict_card_segments(limit=SEGMENT_CACHE_LIMIT_BYTES):
+    """Delete least recently used card segments until the cache fits in limit bytes."""
+    entries = []
+    for path in SEGMENT_FOLDER.glob("card_*.ts"):
+        if '.tmp.' in path.name:
+            continue
+        try:
+            entries.append((path.stat(), path))
+        except FileNotFoundError:
+            continue
+    total = sum(st.st_size for st, _ in entries)
+    cutoff = time.time() - SEGMENT_CACHE_GRACE
+    for st, path in sorted(entries, key=lambda e: e[0].st_mtime):
+        if total <= limit or st.st_mtime > cutoff:
+            break
+        path.unlink(missing_ok=True)
+        total -= st.st_size
+
+
+def assemble_with_segments(segments, output_path, work_prefix):
+    """
+    Build the video from cached card segments plus fresh encodes of the
+    clip runs between them, joined with the concat demuxer by stream copy.
+    """
+    parts = []
+    run = []
+    for seg in segments + [None]:
+        if seg is not None and seg['kind'] == 'video':
+            run.append(seg)
+            continue
+        if run:
+            # Only the real footage is encoded for this video
+            run_path = Path(f"{work_prefix}_clips{len(parts)}.ts")
+            subprocess.run(build_ffmpeg_command(run, run_path, SEGMENT_ENCODE_ARGS), check=True)
+            parts.append(run_path)
+            run = []
+        if seg is not None:
+            parts.append(cached_card_segment(seg))
+
+    list_path = Path(f"{work_prefix}_concat.txt")
+    list_path.write_text(''.join(f"file '{Path(p).resolve()}'\n" for p in parts))
+    cmd = [
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'concat', '-safe', '0', '-i', str(list_path),
+        '-c', 'copy', '-bsf:a', 'aac_adtstoasc',
+        '-movflags', '+faststart',
+        str(output_path)
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def create_video_ffmpeg(reaction_type, hook_text, video_num, segment_cache=USE_SEGMENT_CACHE):
+    """Create a single combined video with one ffmpeg filter graph instead of moviepy."""
+    print(f"\n{'='*50}")
+    print(f"📹 Creating Video {video_num} ({reaction_type} reaction) [ffmpeg]")
+    print(f"   Hook: \"{hook_text}\"")
+    print(f"{'='*50}")
+
+    work_prefix = OUTPUT_FOLDER / f"_work_{video_num}_{os.getpid()}_{os.urandom(4).hex()}"
+    segments = []
+
+    try:
+        segments = build_timeline(reaction_type, hook_text, work_prefix)
+
+        output_path = OUTPUT_FOLDER / f"video_{video_num}_{reaction_type}.mp4"
+        print(f"   ⏳ Exporting to: {output_path}")
+        # Rendered as a work file (removed below on failure) and renamed into place
+        tmp_path = work_prefix.with_name(f"{work_prefix.name}_output.mp4")
+        assembled = False
+        if segment_cache:
+            try:
+                assemble_with_segments(segments, tmp_path, work_prefix)
+                assembled = True
+            except Exception as e:
+                print(f"   ⚠️  Segment assembly failed ({e}); rendering in a single pass.")
+        if not assembled:
+            subprocess.run(build_ffmpeg_command(segments, tmp_path), check=True)
+        os.replace(tmp_path, output_path)
+
+        print(f"   ✅ Video {video_num} saved: {output_path}")
+        return str(output_path)
+
+    except Exception as e:
+        print(f"   ❌ Error creating video {video_num}: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+    finally:
+        # Clean up card images and intermediate clip encodes
+        for work_file in OUTPUT_FOLDER.glob(f"{work_prefix.name}_*"):
+            work_file.unlink(missing_ok=True)
+
+
+# ═══════════════════════════════════════════════════════
+# PARALLEL GENERATION
+# ═══════════════════════════════════════════════════════
+
+def render_task(task):
+    """Worker entry point: render one video and report how it went."""
+    reaction, hook, video_num, backend, segment_cache = task
+    start = time.time()
+    try:
+        path = create_video(reaction, hook, video_num, backend=backend, segment_cache=segment_cache)
+        error = None if path else "render failed (see log above)"
+    except Exception as e:
+        path, error = None, str(e)
+    return {
+        "video_num": video_num,
+        "reaction": reaction,
+        "path": path,
+        "error": error,
+        "seconds": time.time() - start,
+    }
+
+
+def render_all(tasks, workers):
+    """Render every task, in worker processes when workers > 1."""
+    if workers <= 1:
+        return [render_task(task) for task in tasks]
+    # Reseed in each worker; forked processes would otherwise all pick the
+    # same demo clip and CTA
+    with ProcessPoolExecutor(max_workers=workers, initializer=random.seed) as pool:
+        return list(pool.map(render_task, tasks))
 
 
 # ═══════════════════════════════════════════════════════
 # MAIN
 # ═══════════════════════════════════════════════════════
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate today's NoteWall reaction videos.")
+    parser.add_argument("--backend", choices=["moviepy", "ffmpeg"], default=RENDER_BACKEND,
+                        help="render engine (default: %(default)s)")
+    parser.add_argument("--no-segment-cache", action="store_true",
+                        help="ffmpeg backend: re-encode cards every time instead of reusing cached segments")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="render videos in this many parallel processes (default: %(default)s)")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     print("""
 ╔══════════════════════════════════════════════════════╗
 ║       🎯 NoteWall UGC Video Generator               ║
@@ -503,6 +935,7 @@ def main():
     print(f"📁 UGC folder: {UGC_FOLDER}")
     print(f"📁 Demo folder: {DEMO_FOLDER}")
     print(f"📁 Output folder: {OUTPUT_FOLDER}")
+    print(f"🎞️  Render backend: {args.backend}")
 
     # Create output directory
     OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
@@ -549,25 +982,31 @@ def main():
         print(f"   Hook {i+1} ({REACTIONS[i]}): \"{hook}\"")
 
     # Generate videos
-    print(f"\n🎬 Starting video generation...\n")
-    results = []
-
-    for i, reaction in enumerate(REACTIONS):
-        hook = hooks[i]
-        result = create_video(reaction, hook, i + 1)
-        results.append(result)
+    workers = max(1, min(args.workers, len(REACTIONS)))
+    print(f"\n🎬 Starting video generation ({workers} worker{'s' if workers > 1 else ''})...\n")
+    tasks = [
+        (reaction, hooks[i], i + 1, args.backend, not args.no_segment_cache)
+        for i, reaction in enumerate(REACTIONS)
+    ]
+    start = time.time()
+    results = render_all(tasks, workers)
+    elapsed = time.time() - start
 
     # Summary
     print(f"\n{'='*50}")
     print(f"📊 GENERATION SUMMARY")
     print(f"{'='*50}")
-    successful = [r for r in results if r]
-    failed = len(results) - len(successful)
+    successful = [r for r in results if r["path"]]
+    failed = [r for r in results if not r["path"]]
     print(f"✅ Successful: {len(successful)}")
     if failed:
-        print(f"❌ Failed: {failed}")
+        print(f"❌ Failed: {len(failed)}")
     for r in successful:
-        print(f"   📹 {r}")
+        print(f"   📹 {r['path']} ({r['seconds']:.1f}s)")
+    for r in failed:
+        print(f"   ❌ Video {r['video_num']} ({r['reaction']}): {r['error']}")
+    print(f"⏱️  Total: {elapsed:.1f}s wall clock, "
+          f"{sum(r['seconds'] for r in results):.1f}s of render time")
     print(f"\n🎉 Done! Find your videos in: {OUTPUT_FOLDER}")
 
 
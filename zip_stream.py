@@ -0,0 +1,63 @@
+"""
+Stream a ZIP archive of files on disk without building it in memory.
+
+zipfile can write to a non-seekable sink (it falls back to data
+descriptors), so we give it a sink that just collects whatever was written
+and hand those bytes to the HTTP response after every chunk. Peak memory is
+one read chunk regardless of how many or how large the entries are.
+"""
+
+import zipfile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object that buffers bytes until drained."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries, compress_type=zipfile.ZIP_STORED):
+    """
+    Yield a ZIP archive of (arcname, path) entries piece by piece.
+
+    entries may be a lazy iterable; each file is only opened when it is
+    reached, so the download can start before later entries exist. Entries
+    are stored uncompressed by default since our payloads are H.264 MP4s
+    that DEFLATE can't shrink.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=compress_type, allowZip64=True) as zf:
+        for arcname, path in entries:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            zinfo.compress_type = compress_type
+            force_zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT
+            with open(path, "rb") as src, zf.open(zinfo, "w", force_zip64=force_zip64) as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()